@@ -1,8 +1,13 @@
 from flask import Flask, request, jsonify, send_from_directory
-import threading
 import os
 import json
 from bot import RAGExpertTechnicalInterviewer 
+from sessions import InterviewSessionManager, SessionLimitError
+from gemini_client import get_gemini_client
+from tts import tts_stats
+from sandbox import get_sandbox
+from question_bank import get_question_bank
+from knowledge_base import knowledge_base_stats
 
 app = Flask(__name__, static_folder='frontend')
 
@@ -14,46 +19,66 @@ def index():
 def serve_static(path):
     return send_from_directory('frontend', path)
 
-# Global instance of the interviewer
-interviewer_instance = None
-interview_thread = None
+# Registry of running interviews, one RAGExpertTechnicalInterviewer per session
+session_manager = InterviewSessionManager(RAGExpertTechnicalInterviewer)
+
+
+def _get_session_id():
+    """Read the session ID from the JSON body or the query string."""
+    data = request.get_json(silent=True) or {}
+    return data.get("session_id") or request.args.get("session_id")
+
 
 @app.route('/start_interview', methods=['POST'])
 def start_interview():
     """
     Start a new interview session.
     """
-    global interviewer_instance, interview_thread
-
-    if interviewer_instance and interviewer_instance.interview_active:
-        return jsonify({"status": "error", "message": "An interview is already in progress."}), 400
-
     try:
         # Initialize the RAGExpertTechnicalInterviewer
-        data = request.json
+        data = request.get_json(silent=True) or {}
         model = data.get("model", "gemini-2.0-flash")
         accent = data.get("accent", "indian")
+        # Lets the question bank avoid repeating challenges for a returning candidate
+        candidate_id = data.get("candidate_id")
 
-        interviewer_instance = RAGExpertTechnicalInterviewer(model=model, accent=accent)
+        # The interview runs on the session manager's worker pool
+        session = session_manager.create(model=model, accent=accent, candidate_id=candidate_id)
 
-        # Start the interview in a separate thread
-        interview_thread = threading.Thread(target=interviewer_instance.start_interview)
-        interview_thread.daemon = True
-        interview_thread.start()
-
-        return jsonify({"status": "success", "message": "Interview started successfully."})
+        return jsonify({"status": "success", "message": "Interview started successfully.",
+                        "session_id": session.session_id})
+    except SessionLimitError as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
     except Exception as e:
         return jsonify({"status": "error", "message": f"Failed to start interview: {str(e)}"}), 500
 
 
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    """
+    List the interview sessions currently held by the server.
+    """
+    return jsonify({"status": "success", "sessions": session_manager.list_sessions()})
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Report Gemini client, text-to-speech backend, code sandbox, question bank and knowledge base metrics.
+    """
+    return jsonify({"status": "success", "gemini": get_gemini_client().stats(), "tts": tts_stats(),
+                    "sandbox": get_sandbox().stats(), "question_bank": get_question_bank().stats(),
+                    "knowledge_base": knowledge_base_stats()})
+
+
 @app.route('/ask_question', methods=['POST'])
 def ask_question():
     """
     Ask a question during the interview.
     """
-    global interviewer_instance
+    session = session_manager.get(_get_session_id())
 
-    if not interviewer_instance or not interviewer_instance.interview_active:
+    if not session or not session.active:
         return jsonify({"status": "error", "message": "No active interview session found."}), 400
 
     try:
@@ -64,7 +89,7 @@ def ask_question():
             return jsonify({"status": "error", "message": "Question is required."}), 400
 
         # Use the query_gemini_with_rag method to generate a response
-        response = interviewer_instance.query_gemini_with_rag(question, question)
+        response = session.interviewer.query_gemini_with_rag(question, question)
 
         return jsonify({"status": "success", "response": response})
     except Exception as e:
@@ -74,36 +99,98 @@ def ask_question():
 @app.route('/end_interview', methods=['POST'])
 def end_interview():
     """
-    End the current interview session.
+    End an interview session.
     """
-    global interviewer_instance, interview_thread
+    session_id = _get_session_id()
+    session = session_manager.get(session_id)
 
-    if not interviewer_instance or not interviewer_instance.interview_active:
+    if not session or not session.active:
         return jsonify({"status": "error", "message": "No active interview session found."}), 400
 
     try:
-        interviewer_instance.interview_active = False
-        if interview_thread and interview_thread.is_alive():
-            interview_thread.join(timeout=5)  # Wait for the thread to finish gracefully
-
-        interviewer_instance = None
+        # Stops the interview and waits for its worker to finish gracefully
+        session_manager.end(session_id)
         return jsonify({"status": "success", "message": "Interview ended successfully."})
     except Exception as e:
         return jsonify({"status": "error", "message": f"Error ending interview: {str(e)}"}), 500
 
 
+@app.route('/focus_event', methods=['POST'])
+def focus_event():
+    """
+    Record a focus change (visibilitychange/blur/focus) reported by the browser.
+    """
+    session = session_manager.get(_get_session_id())
+
+    if not session or not session.active:
+        return jsonify({"status": "error", "message": "No active interview session found."}), 400
+
+    try:
+        data = request.get_json(silent=True) or {}
+        state = data.get("state")
+        timestamp = data.get("timestamp")
+        if timestamp is not None:
+            # Date.now() in the browser is in milliseconds
+            timestamp = float(timestamp) / 1000.0
+
+        changed = session.interviewer.focus_monitor.report(state, source="browser", timestamp=timestamp)
+        return jsonify({"status": "success", "changed": changed})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Error recording focus event: {str(e)}"}), 500
+
+
+@app.route('/focus_events', methods=['GET'])
+def focus_events():
+    """
+    List the timestamped focus changes of an interview session.
+    """
+    session = session_manager.get(_get_session_id())
+
+    if not session:
+        return jsonify({"status": "error", "message": "No interviewer instance found."}), 400
+
+    return jsonify({"status": "success", "events": session.interviewer.focus_monitor.history()})
+
+
+@app.route('/submit_code', methods=['POST'])
+def submit_code():
+    """
+    Grade the candidate's code against the current challenge's test suite.
+    """
+    session = session_manager.get(_get_session_id())
+
+    if not session or not session.active:
+        return jsonify({"status": "error", "message": "No active interview session found."}), 400
+
+    data = request.get_json(silent=True) or {}
+    language = data.get("language")
+    code = data.get("code")
+    if not language or not code:
+        return jsonify({"status": "error", "message": "Both language and code are required."}), 400
+
+    try:
+        report = session.interviewer.submit_code(language, code)
+        return jsonify({"status": "success", "summary": report.summary(), "report": report.to_dict()})
+    except (ValueError, RuntimeError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Error grading submission: {str(e)}"}), 500
+
+
 @app.route('/knowledge_base', methods=['GET'])
 def get_knowledge_base():
     """
     Retrieve the current knowledge base.
     """
-    global interviewer_instance
+    session = session_manager.get(_get_session_id())
 
-    if not interviewer_instance:
+    if not session:
         return jsonify({"status": "error", "message": "No interviewer instance found."}), 400
 
     try:
-        knowledge_base = interviewer_instance._load_knowledge_base()
+        knowledge_base = session.interviewer._load_knowledge_base()
         return jsonify({"status": "success", "knowledge_base": knowledge_base})
     except Exception as e:
         return jsonify({"status": "error", "message": f"Error loading knowledge base: {str(e)}"}), 500
@@ -114,9 +201,9 @@ def add_to_knowledge_base():
     """
     Add new text to the knowledge base.
     """
-    global interviewer_instance
+    session = session_manager.get(_get_session_id())
 
-    if not interviewer_instance:
+    if not session:
         return jsonify({"status": "error", "message": "No interviewer instance found."}), 400
 
     try:
@@ -126,8 +213,10 @@ def add_to_knowledge_base():
         if not text:
             return jsonify({"status": "error", "message": "Text is required."}), 400
 
-        interviewer_instance._add_to_knowledge_base(text)
-        return jsonify({"status": "success", "message": "Text added to knowledge base successfully."})
+        if not session.interviewer._add_to_knowledge_base(text):
+            return jsonify({"status": "success", "added": False,
+                            "message": "Nothing was added: the text is empty, a placeholder or already in the knowledge base."})
+        return jsonify({"status": "success", "added": True, "message": "Text added to knowledge base successfully."})
     except Exception as e:
         return jsonify({"status": "error", "message": f"Error adding to knowledge base: {str(e)}"}), 500
 
@@ -140,5 +229,5 @@ if __name__ == '__main__':
         print(f"Missing environment variables: {', '.join(missing_vars)}")
         exit(1)
 
-    # Run the Flask app
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Run the Flask app (threaded so concurrent sessions are served in parallel)
+    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
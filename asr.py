@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+
+import speech_recognition as sr
+
+
+class ASRSession:
+    """Transcription of a single utterance, fed frame by frame as it is spoken."""
+
+    def accept(self, frame):
+        """Consume raw PCM; return the current partial hypothesis or None."""
+        return None
+
+    def finish(self):
+        """Return the final transcript.
+
+        Raises ``sr.UnknownValueError`` when nothing intelligible was said and
+        ``sr.RequestError`` when the engine itself failed.
+        """
+        raise NotImplementedError
+
+
+class ASRBackend:
+    """Speech recognition engine that creates one ASRSession per utterance."""
+
+    name = "base"
+
+    def start_session(self, sample_rate, sample_width):
+        raise NotImplementedError
+
+
+class _GoogleSession(ASRSession):
+    def __init__(self, recognizer, sample_rate, sample_width):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frames = []
+
+    def accept(self, frame):
+        self.frames.append(frame)
+        return None
+
+    def finish(self):
+        audio = sr.AudioData(b"".join(self.frames), self.sample_rate, self.sample_width)
+        return self.recognizer.recognize_google(audio)
+
+
+class GoogleASR(ASRBackend):
+    """Google Web Speech API; audio is sent once the utterance has ended."""
+
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def start_session(self, sample_rate, sample_width):
+        return _GoogleSession(self.recognizer, sample_rate, sample_width)
+
+
+class _VoskSession(ASRSession):
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.last_partial = None
+
+    def accept(self, frame):
+        if self.recognizer.AcceptWaveform(frame):
+            # Vosk finalized a segment mid-utterance; keep it as the running hypothesis
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            self.last_partial = f"{self.last_partial or ''} {text}".strip() if text else self.last_partial
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+            if partial:
+                return f"{self.last_partial or ''} {partial}".strip()
+        return self.last_partial
+
+    def finish(self):
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        text = f"{self.last_partial or ''} {text}".strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class VoskASR(ASRBackend):
+    """Offline streaming recognition on CPU with a Vosk (Kaldi) model.
+
+    The model directory comes from ``model_path`` or VOSK_MODEL_PATH and is
+    loaded once and shared by all sessions.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_path=None):
+        import vosk
+
+        model_path = model_path or os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
+        if not os.path.isdir(model_path):
+            raise RuntimeError(f"Vosk model not found at {model_path}")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def start_session(self, sample_rate, sample_width):
+        if sample_width != 2:
+            raise ValueError("Vosk needs 16-bit PCM")
+        return _VoskSession(self.vosk.KaldiRecognizer(self.model, sample_rate))
+
+
+ASR_BACKENDS = {
+    "google": GoogleASR,
+    "vosk": VoskASR,
+}
+
+_asr_backends = {}
+_asr_lock = threading.Lock()
+
+
+def get_asr_backend(name=None):
+    """Return the process-wide ASR backend selected by ``name`` or ASR_BACKEND.
+
+    Falls back to Google if an offline engine cannot be loaded.
+    """
+    name = (name or os.getenv("ASR_BACKEND", "google")).lower()
+    with _asr_lock:
+        backend = _asr_backends.get(name)
+        if backend is None:
+            try:
+                backend = ASR_BACKENDS[name]()
+            except Exception as e:
+                print(f"[ASR] {name} backend unavailable ({e}); using Google")
+                backend = _asr_backends.get("google") or GoogleASR()
+                _asr_backends["google"] = backend
+            _asr_backends[name] = backend
+        return backend
@@ -0,0 +1,225 @@
+import collections
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import speech_recognition as sr
+from concurrent.futures import ThreadPoolExecutor
+
+from asr import GoogleASR
+
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+
+class VoiceActivityDetector:
+    """Per-frame speech/non-speech decisions.
+
+    Uses WebRTC VAD when the ``webrtcvad`` package is installed and the
+    sample rate and frame size are ones it supports; otherwise (and as a
+    noise gate in either case) compares frame energy against the
+    recognizer's adaptive ``energy_threshold``.
+    """
+
+    def __init__(self, recognizer, sample_rate, frame_samples, aggressiveness=2):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.vad = None
+        frame_ms = 1000.0 * frame_samples / sample_rate
+        if webrtcvad is not None and sample_rate in (8000, 16000, 32000, 48000) and frame_ms in (10.0, 20.0, 30.0):
+            self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame, energy, threshold_ratio=1.0):
+        if energy <= self.recognizer.energy_threshold * threshold_ratio:
+            return False
+        if self.vad is not None:
+            return self.vad.is_speech(frame, self.sample_rate)
+        return True
+
+
+class MicrophoneStream:
+    """Long-lived microphone capture that segments speech into utterances.
+
+    A dedicated thread keeps the microphone open, calibrates the shared
+    recognizer's energy threshold once at startup and then keeps adapting it
+    during silence. Every frame is classified by a VoiceActivityDetector:
+    an utterance starts once most of the last ``onset_frames`` frames are
+    voiced (with ring-buffer pre-roll) and ends after ``hangover_ms`` of
+    non-speech.
+
+    Frames are fed to an ASR session while the candidate is still talking,
+    and partial hypotheses go to ``on_partial``. Finalizing runs on a worker
+    thread so capture never stalls, and ``get_transcript`` returns the
+    results in order.
+
+    ``on_speech_start`` is called from the capture thread when an utterance
+    begins and returns whether to keep it; this is where barge-in happens.
+    While ``is_playing()`` is true the interviewer's own voice reaches the
+    microphone, so a louder signal (``barge_in_ratio`` times the threshold)
+    is required to count as speech, and ``on_speech_start`` is only called
+    once ``min_speech_ms`` of it has been heard.
+    """
+
+    def __init__(self, microphone, recognizer, asr_backend=None, is_playing=None,
+                 on_speech_start=None, on_partial=None,
+                 calibration_seconds=1.0, ring_seconds=10, phrase_time_limit=60, max_age=20,
+                 hangover_ms=None, min_speech_ms=None, onset_frames=5, barge_in_ratio=None,
+                 aggressiveness=None):
+        self.microphone = microphone
+        self.recognizer = recognizer
+        self.is_playing = is_playing or (lambda: False)
+        self.on_speech_start = on_speech_start or (lambda: True)
+        self.on_partial = on_partial or (lambda text: None)
+        self.asr_backend = asr_backend or GoogleASR(recognizer)
+        self.finalizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr-final")
+        self.calibration_seconds = calibration_seconds
+        self.ring_seconds = ring_seconds
+        self.phrase_time_limit = phrase_time_limit
+        self.max_age = max_age
+        self.hangover = (hangover_ms or float(os.getenv("VAD_HANGOVER_MS", "600"))) / 1000.0
+        self.min_speech = (min_speech_ms or float(os.getenv("VAD_MIN_SPEECH_MS", "200"))) / 1000.0
+        self.onset_frames = onset_frames
+        self.barge_in_ratio = barge_in_ratio or float(os.getenv("VAD_BARGE_IN_RATIO", "3.0"))
+        self.aggressiveness = aggressiveness if aggressiveness is not None else int(os.getenv("VAD_AGGRESSIVENESS", "2"))
+        self.utterances = queue.Queue()
+        self.running = False
+        self.calibrated = threading.Event()
+        self.in_speech = threading.Event()
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        # A device error from an earlier run shouldn't fail this one
+        self.error = None
+        self.running = True
+        self.thread = threading.Thread(target=self._capture, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def get_transcript(self, timeout=15):
+        """Return the next final transcript, or raise ``sr.WaitTimeoutError``.
+
+        The timeout only covers waiting for speech to start; an utterance in
+        progress is always waited for. Recognition errors from the ASR
+        backend (``sr.UnknownValueError``, ``sr.RequestError``) propagate.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.error is not None:
+                raise OSError(f"Microphone capture stopped: {self.error}")
+            if time.monotonic() >= deadline and not self.in_speech.is_set():
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            try:
+                ended_at, transcript = self.utterances.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            # Skip speech left over from long before this turn
+            if time.monotonic() - ended_at <= self.max_age:
+                return transcript.result()
+
+    def _feed(self, session, chunks):
+        partial = None
+        for chunk in chunks:
+            partial = session.accept(chunk) or partial
+        if partial:
+            self.on_partial(partial)
+
+    def _begin_utterance(self, frames, sample_rate, sample_width):
+        """Ask ``on_speech_start`` whether to keep the utterance; returns ``(keep, session)``."""
+        keep = self.on_speech_start()
+        session = None
+        if keep:
+            session = self.asr_backend.start_session(sample_rate, sample_width)
+            self._feed(session, frames)
+        return keep, session
+
+    def _energy(self, chunk):
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+    def _capture(self):
+        try:
+            with self.microphone as source:
+                sample_rate = source.SAMPLE_RATE
+                sample_width = source.SAMPLE_WIDTH
+                chunk_size = source.CHUNK
+                seconds_per_chunk = float(chunk_size) / sample_rate
+                vad = VoiceActivityDetector(self.recognizer, sample_rate, chunk_size, self.aggressiveness)
+
+                # One-time calibration; the threshold keeps adapting below
+                self.recognizer.adjust_for_ambient_noise(source, duration=self.calibration_seconds)
+                self.calibrated.set()
+
+                ring = collections.deque(maxlen=max(1, int(self.ring_seconds / seconds_per_chunk)))
+                recent = collections.deque(maxlen=self.onset_frames)
+                frames = None
+                session = None
+                keep = True
+                silence = 0.0
+                speech_time = 0.0
+
+                while self.running:
+                    chunk = source.stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    ring.append(chunk)
+                    energy = self._energy(chunk)
+                    playing = self.is_playing()
+                    voiced = vad.is_speech(chunk, energy, self.barge_in_ratio if playing else 1.0)
+                    recent.append(voiced)
+
+                    if frames is None:
+                        if sum(recent) * 2 > self.onset_frames:
+                            # Include the onset frames plus the pre-roll before them
+                            pre_roll = len(recent) + int(self.recognizer.non_speaking_duration / seconds_per_chunk)
+                            frames = list(ring)[-pre_roll:]
+                            silence = 0.0
+                            speech_time = sum(recent) * seconds_per_chunk
+                            self.in_speech.set()
+                            keep = None
+                            # Over the interviewer's voice, wait for min_speech so a cough can't barge in
+                            if not playing or speech_time >= self.min_speech:
+                                keep, session = self._begin_utterance(frames, sample_rate, sample_width)
+                        elif not voiced and not playing and self.recognizer.dynamic_energy_threshold:
+                            damping = self.recognizer.dynamic_energy_adjustment_damping ** seconds_per_chunk
+                            target = energy * self.recognizer.dynamic_energy_ratio
+                            threshold = self.recognizer.energy_threshold
+                            self.recognizer.energy_threshold = threshold * damping + target * (1 - damping)
+                        continue
+
+                    frames.append(chunk)
+                    if voiced:
+                        silence = 0.0
+                        speech_time += seconds_per_chunk
+                    else:
+                        silence += seconds_per_chunk
+                    if keep is None and speech_time >= self.min_speech:
+                        keep, session = self._begin_utterance(frames, sample_rate, sample_width)
+                    elif session is not None:
+                        self._feed(session, [chunk])
+                    duration = len(frames) * seconds_per_chunk
+
+                    if silence >= self.hangover or duration >= self.phrase_time_limit:
+                        if session is not None and speech_time >= self.min_speech:
+                            self.utterances.put((time.monotonic(), self.finalizer.submit(session.finish)))
+                        frames = None
+                        session = None
+                        recent.clear()
+                        self.in_speech.clear()
+        except Exception as e:
+            print(f"Microphone capture error: {e}")
+            self.error = e
+        finally:
+            self.running = False
+            self.in_speech.clear()
@@ -4,7 +4,6 @@ import random
 import time
 import requests
 import speech_recognition as sr
-from gtts import gTTS
 import pygame
 import queue
 from io import BytesIO
@@ -12,43 +11,139 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 import cv2
 import numpy as np
-import pygetwindow as gw
 import threading
 import wave
 from scipy.io import wavfile
-import subprocess
-import tempfile
 import sys
-import boto3
-from sentence_transformers import SentenceTransformer
-import faiss  # For vector similarity search
 import json
 import os
+import tempfile
+import uuid
+from knowledge_base import get_shared_knowledge_base
+from cache import get_response_cache, prompt_fingerprint
+from gemini_client import get_gemini_client
+from tts import get_tts, pcm_to_sound
+from audio_capture import MicrophoneStream
+from asr import get_asr_backend
+from vision import AttentionEventTracker, FaceAttentionAnalyzer
+from focus import FocusMonitor, create_focus_source
+from proctoring import ProctoringEventBus, ProctoringScheduler
+from sandbox import get_sandbox
+from challenges import FALLBACK_CHALLENGES, generate_challenge, grade
+from question_bank import TECH_DOMAINS, gemini_query, get_question_bank
+from prefetch import QuestionPrefetcher
 
 # Load environment variables
 load_dotenv()
 
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# The pygame mixer is process-wide and shared by every interview session
+_mixer_lock = threading.Lock()
+
+
+def init_mixer():
+    """Initialize the pygame mixer once per process."""
+    with _mixer_lock:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+            # One channel per concurrent interview, so no session finds them all busy
+            pygame.mixer.set_num_channels(max(8, int(os.getenv("MAX_CONCURRENT_INTERVIEWS", "32"))))
+
+
+def split_sentences(chunks, min_length=20):
+    """Re-chunk streamed text into sentences.
+
+    Fragments shorter than ``min_length`` are merged with the next sentence
+    so TTS isn't called for tiny pieces like "Sure."
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        parts = SENTENCE_END.split(buffer)
+        buffer = parts.pop()
+        pending = ""
+        for part in parts:
+            pending = f"{pending} {part}".strip()
+            if len(pending) >= min_length:
+                yield pending
+                pending = ""
+        buffer = f"{pending} {buffer}".strip() if pending else buffer
+    if buffer.strip():
+        yield buffer.strip()
+
 class ExpertTechnicalInterviewer:
-    def __init__(self, model="gemini-2.0-flash", accent="indian"):
+    CHEATING_REMINDERS = {
+        "no_face": "Please ensure your face is clearly visible to the camera for the interview.",
+        "multiple_faces": "I notice multiple people in the frame. Please ensure you're alone during this interview.",
+        "looking_away": "Please maintain focus on the interview and avoid looking at other devices.",
+        "tab_change": "Please stay focused on the interview window and avoid switching to other applications."
+    }
+
+    # Lines spoken verbatim in every interview; their audio is pre-synthesized at startup
+    STATIC_PHRASES = (
+        "Hello! I am Gyani. Welcome to your interview session today. I'm excited to chat with you!",
+        "Before we begin, how has your day been so far?",
+        "That's great to hear! I appreciate you taking the time for this session.",
+        "Now, could you please tell me your name and a bit about yourself?",
+        "Could you please elaborate on that?",
+        "I didn't hear anything. Please speak when you're ready.",
+        "I couldn't quite catch that. Could you please repeat?",
+        "Let's continue with the next part of our interview.",
+        "Would you like a small hint to help you get started?",
+        "Does that answer your question, or would you like me to elaborate?",
+        "Do you have any other questions?",
+        "What would you like to ask?",
+        "Multiple concerning behaviors detected. The interview will now conclude.",
+        "Thank you so much for your time today. It was a pleasure talking with you, and I wish you the best of luck!",
+    )
+
+    def __init__(self, model="gemini-2.0-flash", accent="indian", candidate_id=None):
         try:
             self.api_key = os.getenv("GEMINI_API_KEY")
             if not self.api_key:
                 raise ValueError("Please set the GEMINI_API_KEY in .env file")
 
             genai.configure(api_key=self.api_key)
+            self.model_name = model
             self.model = genai.GenerativeModel(model)
+            self.response_cache = get_response_cache()
+            self.gemini_client = get_gemini_client()
+            # Speak long generated answers sentence by sentence while they stream in
+            self.streaming_tts = os.getenv("TTS_STREAMING", "1") == "1"
             self.interview_state = "introduction"
             self.skill_questions_asked = 0
             self.last_question = None
             self.just_repeated = False
             self.current_domain = None
+            # Identifies the candidate across sessions so the question bank doesn't repeat itself
+            self.candidate_id = candidate_id or uuid.uuid4().hex
+            # Anonymous IDs never come back, so their history isn't kept past the session
+            self.anonymous_candidate = candidate_id is None
             self.conversation_history = []
             self.recognizer = sr.Recognizer()
-            self.microphone = sr.Microphone()
+            # 16 kHz mono in 30 ms frames, the format WebRTC VAD works on
+            self.microphone = sr.Microphone(sample_rate=16000, chunk_size=480)
             self.is_listening = False
             self.interrupted = False
             self.recognizer.pause_threshold = 0.6
             self.recognizer.phrase_threshold = 0.2
+            # Keeps the microphone open for the whole interview; calibrated once on start
+            self.mic_stream = MicrophoneStream(
+                self.microphone,
+                self.recognizer,
+                asr_backend=get_asr_backend(),
+                is_playing=lambda: not self.playback_done.is_set(),
+                on_speech_start=self._on_candidate_speech,
+                on_partial=self._on_partial_transcript
+            )
+            # Latest streaming hypothesis for the answer in progress
+            self.partial_transcript = ""
+            # Drafts the next question from that hypothesis while the candidate is still talking
+            self.prefetcher = QuestionPrefetcher(
+                lambda prompt: self.gemini_client.submit(self.model, prompt),
+                to_text=self._response_text
+            )
             self.tone_warnings = 0
             self.cheating_warnings = 0
             self.filler_phrases = [
@@ -58,39 +153,52 @@ class ExpertTechnicalInterviewer:
             self.tab_monitor_ready = False
             self.last_face_detection_time = time.time()
             self.tab_change_detected = False
+            # Focus changes pushed by the browser (/focus_event) or an OS event source
+            self.focus_monitor = FocusMonitor(self._on_focus_lost)
+            # Monitors publish here; one scheduler decides when warnings are spoken
+            self.proctoring_bus = ProctoringEventBus()
+            self.proctoring_scheduler = ProctoringScheduler(
+                self.proctoring_bus,
+                deliver=lambda cheat_type, events: self._handle_cheating_attempt(cheat_type),
+                is_speaking=lambda: not self.playback_done.is_set(),
+                interrupt=self._interrupt_for_warning,
+                is_listening=lambda: self.mic_stream.in_speech.is_set(),
+            )
+            # Serializes audio output between the interview and the proctoring scheduler
+            self.speech_lock = threading.RLock()
             self.response_delay = 0.3
             self.accent = accent.lower()
             self.interview_active = True
+            # When the candidate last spoke; keeps a running interview from looking idle
+            self.last_candidate_activity = time.time()
             self.coding_questions_asked = 0
             self.max_coding_questions = 2
-            self.polly = boto3.client(
-                "polly",
-                region_name=os.getenv("AWS_REGION"),
-                aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-                aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-            )
+            # Polly, gTTS or local espeak (TTS_BACKENDS), with failover between them
+            self.tts = get_tts(self.accent)
+            self.playback_done = threading.Event()
+            self.playback_done.set()
+            self.playback_channel = None
+            self.playback_interruptible = False
             
-            # Initialize face detection
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+            # Initialize face detection (rate-limited and downscaled, see vision.py)
+            self.face_analyzer = FaceAttentionAnalyzer()
             
             # Initialize camera
             self.cap = None
             self.camera_active = False
             self.current_coding_question = None
+            self.current_challenge = None
+            self.coding_results = []
+            # Graded submissions, read by the coding round to move on to the next challenge
+            self.submissions = queue.Queue()
+            # Coding challenges come from the pre-generated bank, topped up in the background
+            self.question_bank = get_question_bank()
+            if os.getenv("QUESTION_BANK_REFILL", "1") == "1":
+                self.question_bank.start_refiller(gemini_query(self.model))
+            # Start the code sandbox's warm workers before the coding round
+            get_sandbox()
             
-            self.tech_domains = {
-                "frontend": ["React", "Angular", "Vue", "JavaScript", "TypeScript", "CSS", "HTML5"],
-                "backend": ["Node.js", "Django", "Spring", "Go", "Rust", "Microservices", "APIs"],
-                "AI": ["TensorFlow", "PyTorch", "NLP", "Computer Vision", "LLMs", "Generative AI"],
-                "data science": [ "data science","Pandas", "NumPy", "SQL", "Data Visualization", "ETL", "Big Data"],
-                "machine learning": ["machine learning","Scikit-learn", "Keras", "Model Deployment", "Feature Engineering"],
-                "devops": ["Docker", "Kubernetes", "AWS", "CI/CD", "Terraform", "Monitoring"],
-                "mobile": ["Flutter", "React Native", "Swift", "Kotlin", "Mobile UX"],
-                "python": ["Python", "Flask", "FastAPI", "Django", "Data Structures", "Algorithms"],
-                "java": ["Java", "Spring Boot", "JVM", "Object Oriented Programming", "Collections"],
-                "cpp": ["C++", "STL", "Memory Management", "Object Oriented Programming", "Data Structures"]
-            }
+            self.tech_domains = TECH_DOMAINS
         
             self.non_tech_domains = {
                 "edtech": ["Curriculum Design", "Learning Management Systems", "Instructional Design", 
@@ -107,14 +215,18 @@ class ExpertTechnicalInterviewer:
             
             # Initialize pygame mixer with error handling
             try:
-                pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+                init_mixer()
             except pygame.error as e:
                 print(f"PyGame mixer initialization failed: {e}")
                 raise RuntimeError("Audio system initialization failed")
+
+            # Synthesize the fixed lines in the background while the interview starts
+            self.tts.prewarm(self._static_phrases())
                 
             # Start monitoring threads
             self.monitoring_active = True
             self.last_question = None
+            self.proctoring_scheduler.start()
             self.face_monitor_thread = threading.Thread(target=self._monitor_face_and_attention)
             self.face_monitor_thread.daemon = True
             self.face_monitor_thread.start()
@@ -128,6 +240,10 @@ class ExpertTechnicalInterviewer:
             raise
 
     def wait_after_speaking(self, message, base=0.6, per_word=0.15):
+        # With the capture stream running, listen() waits for the candidate's
+        # turn itself (VAD onset and end-of-utterance), so no fixed pause is needed
+        if self.mic_stream.running:
+            return
         if not message:
             time.sleep(base + 0.5)
             return
@@ -136,6 +252,27 @@ class ExpertTechnicalInterviewer:
         print(f"[Pause] Waiting {round(delay, 2)}s after speaking.")
         time.sleep(delay)
 
+    def _on_partial_transcript(self, text):
+        """Called from the capture thread with the running ASR hypothesis."""
+        self.partial_transcript = text
+        self.prefetcher.update(text)
+
+    def _on_candidate_speech(self):
+        """Called from the capture thread when the candidate starts talking.
+
+        Returns whether the utterance should be kept. Talking over an
+        interruptible prompt stops playback (barge-in). A non-interruptible
+        prompt plays on, but the candidate's words are still kept: echo is
+        already filtered out by the louder threshold the microphone stream
+        applies while the interviewer is speaking.
+        """
+        self.partial_transcript = ""
+        if not self.playback_done.is_set() and self.playback_interruptible:
+            print("[Barge-in] Candidate started speaking; stopping playback.")
+            self.interrupted = True
+            self.stop_speaking()
+        return True
+
     def _give_small_hint(self, question_text):
         hint_prompt = f"""You are an AI coding interviewer. Give a small hint for the following problem.
         It should not reveal the full solution, just nudge the candidate in the right direction.
@@ -145,7 +282,7 @@ class ExpertTechnicalInterviewer:
 
         Format: Hint: [short helpful nudge]"""
 
-        hint = self.query_gemini(hint_prompt)
+        hint = self.query_gemini(hint_prompt, use_cache=True)
         if hint:
             self.speak(hint.strip(), interruptible=False)
     
@@ -168,7 +305,7 @@ class ExpertTechnicalInterviewer:
         Generate only the question, no additional text."""
         
         try:
-            response = self.query_gemini(prompt)
+            response = self.query_gemini(prompt, use_cache=True)
             return response.strip() if response else None
         except Exception as e:
             print(f"Error generating non-tech question: {e}")
@@ -177,53 +314,60 @@ class ExpertTechnicalInterviewer:
 
     def _get_filler_phrase(self):
         """Return appropriate filler phrases to show active listening"""
-        fillers = [
-            "I see...",
-            "Interesting...",
-            "That makes sense...",
-            "Go on...",
-            "Yes, I understand...",
-            "Right...",
-            "Okay...",
-            "Hmm...",
-            "Got it...",
-            "Please continue..."
-        ]
-        return random.choice(fillers)
+        return random.choice(self.filler_phrases)
 
     def _execute_code(self, language, file_path):
         try:
-            if language == "Python":
-                result = subprocess.run(["python", file_path], capture_output=True, text=True, timeout=10)
-            elif language == "Java":
-                compile_result = subprocess.run(["javac", file_path], capture_output=True, text=True)
-                if compile_result.returncode != 0:
-                    return f"Compile Error:\n{compile_result.stderr}"
-                class_name = os.path.basename(file_path).replace(".java", "")
-                result = subprocess.run(["java", class_name], capture_output=True, text=True, timeout=10, cwd=os.path.dirname(file_path))
-            elif language == "C++":
-                exe_path = file_path.replace(".cpp", ".exe")
-                compile_result = subprocess.run(["g++", file_path, "-o", exe_path], capture_output=True, text=True)
-                if compile_result.returncode != 0:
-                    return f"Compile Error:\n{compile_result.stderr}"
-                result = subprocess.run([exe_path], capture_output=True, text=True, timeout=10)
-            elif language == "JavaScript":
-                result = subprocess.run(["node", file_path], capture_output=True, text=True, timeout=10)
-            else:
-                return "Unsupported language."
-
-            output = ""
-            if result.stdout:
-                output += f"Output:\n{result.stdout}\n"
-            if result.stderr:
-                output += f"Errors:\n{result.stderr}\n"
-            return output if output else "Code executed successfully (no output)."
-
-        except subprocess.TimeoutExpired:
-            return "Error: Code execution timed out (10 seconds limit)"
+            # Warm, resource-limited workers; compiles have their own timeout
+            return get_sandbox().run(language, file_path).format_output()
+        except ValueError:
+            return "Unsupported language."
         except Exception as e:
             return f"Runtime error: {str(e)}"
 
+    def _next_question_prompt(self, is_tech_interview, recent):
+        """Prompt for the next interview question given the ``recent`` conversation messages."""
+        if is_tech_interview:
+            return f"""As a friendly technical interviewer, ask one engaging question about {self.current_domain or 'technology'} 
+            based on this conversation context. The question should:
+            - Be encouraging and conversational
+            - Build on what the candidate has already shared
+            - Test practical knowledge and experience
+            - Be appropriate for their stated experience level
+            - Keep it to one clear question
+            - Focus on real-world application
+            - Do not repeat same question again
+            - Question should be one-liner 
+            
+            Recent conversation: {' '.join(msg['content'] for msg in recent)}
+            
+            Generate only the question in a friendly, conversational tone."""
+        else:
+            return f"""As a friendly professional interviewer, ask one engaging question about {self.current_domain or 'professional work'} 
+            based on this conversation context. The question should:
+            - Be encouraging and conversational
+            - Focus on real-world professional scenarios
+            - Test domain knowledge and problem-solving
+            - Be appropriate for their stated experience level
+            - Keep it to one clear question
+            - Focus on practical situations
+            - Do not repeat same question again
+            - Question should be one-liner 
+            
+            Recent conversation: {' '.join(msg['content'] for msg in recent)}
+            
+            Generate only the question in a friendly, conversational tone."""
+
+    def _prefetch_prompt(self, is_tech_interview, partial, question):
+        """The prompt the next question will be generated from if ``partial`` turns out to be the answer."""
+        # Mirrors what the question loop appends once an answer is accepted
+        projected = self.conversation_history + [
+            {"role": "user", "content": partial},
+            {"role": "user", "content": partial},
+            {"role": "assistant", "content": question},
+        ]
+        return self._next_question_prompt(is_tech_interview, projected[-3:])
+
     def _is_repeat_request(self, text):
         if not text:
             return False
@@ -275,6 +419,7 @@ class ExpertTechnicalInterviewer:
             # Questions Phase - Different for tech vs non-tech
             question_count = 0
             max_questions = 6
+            last_answer = None
             
             if is_tech_interview:
                 self.speak("Let's start with some technical questions to understand your experience better.", interruptible=False)
@@ -285,38 +430,12 @@ class ExpertTechnicalInterviewer:
                 if len(self.conversation_history) > 15:
                     self.conversation_history = self.conversation_history[-8:]
 
-                if is_tech_interview:
-                    system_prompt = f"""As a friendly technical interviewer, ask one engaging question about {self.current_domain or 'technology'} 
-                    based on this conversation context. The question should:
-                    - Be encouraging and conversational
-                    - Build on what the candidate has already shared
-                    - Test practical knowledge and experience
-                    - Be appropriate for their stated experience level
-                    - Keep it to one clear question
-                    - Focus on real-world application
-                    - Do not repeat same question again
-                    - Question should be one-liner 
-                    
-                    Recent conversation: {' '.join(msg['content'] for msg in self.conversation_history[-3:])}
-                    
-                    Generate only the question in a friendly, conversational tone."""
-                else:
-                    system_prompt = f"""As a friendly professional interviewer, ask one engaging question about {self.current_domain or 'professional work'} 
-                    based on this conversation context. The question should:
-                    - Be encouraging and conversational
-                    - Focus on real-world professional scenarios
-                    - Test domain knowledge and problem-solving
-                    - Be appropriate for their stated experience level
-                    - Keep it to one clear question
-                    - Focus on practical situations
-                    - Do not repeat same question again
-                    - Question should be one-liner 
-                    
-                    Recent conversation: {' '.join(msg['content'] for msg in self.conversation_history[-3:])}
-                    
-                    Generate only the question in a friendly, conversational tone."""
-
-                response = self.query_gemini(system_prompt)
+                system_prompt = self._next_question_prompt(is_tech_interview, self.conversation_history[-3:])
+                # Drafted while the candidate was answering, if the answer didn't change much since
+                response = self.prefetcher.take(last_answer)
+                last_answer = None
+                if response is None:
+                    response = self.query_gemini(system_prompt)
                 
                 if response:
                     msg = response.strip()
@@ -334,8 +453,13 @@ class ExpertTechnicalInterviewer:
                         if not self.just_repeated:
                             self.speak(msg)
                             self.wait_after_speaking(msg)
-                        
+
+                        if question_count + 1 < max_questions:
+                            self.prefetcher.arm(
+                                lambda partial, question=msg: self._prefetch_prompt(is_tech_interview, partial, question)
+                            )
                         answer = self.listen()
+                        self.prefetcher.disarm()
                         
                         if answer and self._is_repeat_request(answer):
                             if repeat_attempts < max_repeats:
@@ -368,9 +492,7 @@ class ExpertTechnicalInterviewer:
                                 
                                 Keep it professional and educational."""
                                 
-                                answer_response = self.query_gemini(answer_prompt)
-                                if answer_response:
-                                    self.speak("Let me help with that. " + answer_response, interruptible=False)
+                                self._speak_generated(answer_prompt, prefix="Let me help with that. ")
                                 
                                 placeholder = "[Unable to answer after multiple attempts]"
                                 self.conversation_history.append({"role": "user", "content": placeholder})
@@ -379,6 +501,7 @@ class ExpertTechnicalInterviewer:
                         # Process valid answer
                         elif answer and len(answer.split()) > 4:
                             self.conversation_history.append({"role": "user", "content": answer})
+                            last_answer = answer
                             answer_received = True
                             break
                             
@@ -403,7 +526,8 @@ class ExpertTechnicalInterviewer:
                 time.sleep(1)
 
                 while self.coding_questions_asked < self.max_coding_questions and self.interview_active:
-                    self.current_coding_question = self._generate_coding_question(self.current_domain or "python")
+                    self.current_challenge = self._select_coding_challenge(self.current_domain or "python")
+                    self.current_coding_question = self.current_challenge.prompt_text()
 
                     self.speak("I've prepared a coding challenge for you. Here's the problem:", interruptible=False)
                     self.speak(self.current_coding_question, interruptible=False)
@@ -412,17 +536,24 @@ class ExpertTechnicalInterviewer:
                     hint_offered = False
                     start_time = time.time()
 
-                    while self.coding_questions_asked < self.max_coding_questions and self.interview_active:
-                        time.sleep(1)
-                        
-                        # Offer a hint after 2 minutes of inactivity
-                        if not hint_offered and time.time() - start_time > 120:
-                            self.speak("Would you like a small hint to help you get started?", interruptible=False)
-                            self.wait_after_speaking("Would you like a small hint to help you get started?")
-                            response = self.listen()
-                            if response and "yes" in response.lower():
-                                self._give_small_hint(self.current_coding_question)
-                            hint_offered = True
+                    while self.interview_active:
+                        try:
+                            report = self.submissions.get(timeout=1)
+                        except queue.Empty:
+                            # Offer a hint after 2 minutes of inactivity
+                            if not hint_offered and time.time() - start_time > 120:
+                                self.speak("Would you like a small hint to help you get started?", interruptible=False)
+                                self.wait_after_speaking("Would you like a small hint to help you get started?")
+                                response = self.listen()
+                                if response and "yes" in response.lower():
+                                    self._give_small_hint(self.current_coding_question)
+                                hint_offered = True
+                            continue
+                        if report.challenge is not self.current_challenge:
+                            continue  # A late resubmission for the previous challenge
+                        self.speak(report.summary(), interruptible=False)
+                        self.coding_questions_asked += 1
+                        break
 
                     if not self.interview_active:
                         break
@@ -477,9 +608,8 @@ class ExpertTechnicalInterviewer:
                         - End by asking if they'd like clarification
                         """
                         
-                        answer = self.query_gemini(answer_prompt)
+                        answer = self._speak_generated(answer_prompt)
                         if answer:
-                            self.speak(answer, interruptible=False)
                             self.wait_after_speaking(answer)
                             
                             # Check if they need follow-up
@@ -498,9 +628,8 @@ class ExpertTechnicalInterviewer:
                                 - Include examples
                                 - Keep to 5-6 sentences max"""
                                 
-                                elaboration = self.query_gemini(elaboration_prompt)
+                                elaboration = self._speak_generated(elaboration_prompt)
                                 if elaboration:
-                                    self.speak(elaboration, interruptible=False)
                                     self.wait_after_speaking(elaboration)
                         
                         if questions_asked < max_questions:
@@ -515,6 +644,11 @@ class ExpertTechnicalInterviewer:
             self.interview_active = False
             self.monitoring_active = False
             self._stop_camera()
+            self.mic_stream.stop()
+            self.focus_monitor.close()
+            self.proctoring_scheduler.stop()
+            if self.anonymous_candidate:
+                self.question_bank.forget(self.candidate_id)
 
     def _start_camera(self):
         """Start the camera for face detection"""
@@ -528,67 +662,28 @@ class ExpertTechnicalInterviewer:
             self.cap.release()
             self.camera_active = False
 
-    def _monitor_face_and_attention(self):    
+    def _monitor_face_and_attention(self):
+        attention_events = AttentionEventTracker()
         while self.monitoring_active and self.interview_active:
             try:
                 if not self.camera_active or not self.cap:
                     time.sleep(2)
                     continue
-                    
-                with threading.Lock():  # Add thread safety
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        self._restart_camera()
-                        continue
-                    
-                # Convert to grayscale and apply histogram equalization
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                gray = cv2.equalizeHist(gray)
-                
-                # More accurate face detection parameters
-                faces = self.face_cascade.detectMultiScale(
-                    gray,
-                    scaleFactor=1.05,  # Reduced from 1.1
-                    minNeighbors=7,    # Increased from 5
-                    minSize=(150, 150),# Increased minimum face size
-                    flags=cv2.CASCADE_SCALE_IMAGE
-                )
-                
-                # Only trigger warning if we're very confident
-                if len(faces) > 1:
-                    # Additional verification - check face sizes are similar
-                    areas = [w*h for (x,y,w,h) in faces]
-                    if max(areas)/min(areas) < 4:  # Only if faces are similarly sized
-                        if not multiple_faces_warning_given:
-                            self._handle_cheating_attempt("multiple_faces")
-                            multiple_faces_warning_given = True
-                    else:
-                        multiple_faces_warning_given = False
-                else:
-                    multiple_faces_warning_given = False
-                        
-                # Eye detection and attention check
-                for (x, y, w, h) in faces:
-                    roi_gray = gray[y:y+h, x:x+w]
-                    eyes = self.eye_cascade.detectMultiScale(
-                        roi_gray,
-                        scaleFactor=1.1,
-                        minNeighbors=3,
-                        minSize=(30, 30)
-                    )
-                    
-                    # Only check attention if we have good eye detection
-                    if len(eyes) >= 2:  # At least two eyes detected
-                        eye_centers = [(ex + ew/2, ey + eh/2) for (ex, ey, ew, eh) in eyes]
-                        avg_eye_y = sum(ey for (ex, ey) in eye_centers) / len(eye_centers)
-                        
-                        # More lenient threshold for looking away
-                        if avg_eye_y > h * 0.75 and not looking_away_warning_given:  # Eyes looking down
-                            self._handle_cheating_attempt("looking_away")
-                            looking_away_warning_given = True
-                        elif avg_eye_y <= h * 0.75:
-                            looking_away_warning_given = False
-                
+
+                # Only wake up at the detection rate instead of spinning on every frame
+                wait = self.face_analyzer.interval - (time.monotonic() - (self.face_analyzer.last_detection or 0))
+                if wait > 0:
+                    time.sleep(wait)
+
+                ret, frame = self.cap.read()
+                if not ret:
+                    self._restart_camera()
+                    continue
+
+                result = self.face_analyzer.analyze(frame)
+                for cheat_type in attention_events.update(result):
+                    self.proctoring_bus.publish(cheat_type, "camera", detail={"face_count": result["face_count"]})
+
             except Exception as e:
                 print(f"Camera error: {e}")
                 self._restart_camera()
@@ -601,6 +696,8 @@ class ExpertTechnicalInterviewer:
             self.cap = cv2.VideoCapture(0)
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+            # Keep only the latest frame so a rate-limited reader doesn't get stale ones
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             self.camera_active = True
         except Exception as e:
             print(f"Camera restart failed: {e}")
@@ -609,184 +706,282 @@ class ExpertTechnicalInterviewer:
 
     def _monitor_tab_changes(self):
         while not self.tab_monitor_ready:
+            if not (self.monitoring_active and self.interview_active):
+                return
             time.sleep(0.5)
-        
-        try:
-            initial_window = gw.getActiveWindow()
-            initial_title = initial_window.title if initial_window else "Interview Window"
-        except:
-            initial_window = None
-            initial_title = "Interview Window"
-        
-        warning_given = False
-        
-        while self.monitoring_active and self.interview_active:
-            try:
-                current_window = gw.getActiveWindow()
-                current_title = current_window.title if current_window else initial_title
-                
-                # Only trigger if:
-                # 1. We have a valid window
-                # 2. The title has actually changed significantly
-                # 3. The new title doesn't contain system/keywords
-                if (current_window and initial_window and 
-                    current_title != initial_title and
-                    not any(x in current_title.lower() for x in ["notification", "system", "settings"])):
-                    
-                    if not warning_given:  # Only warn once per change
-                        self.tab_change_detected = True
-                        self._handle_cheating_attempt("tab_change")
-                        warning_given = True
-                else:
-                    warning_given = False
-                    
-                time.sleep(3)  # Longer delay between checks
-                
-            except Exception as e:
-                print(f"Window monitoring error: {e}")
-                time.sleep(3)
+
+        # Browser events arrive through /focus_event; the OS source covers desktop use
+        source = create_focus_source(self.focus_monitor)
+        if source is not None:
+            self.focus_monitor.add_source(source)
+
+    def _on_focus_lost(self, event):
+        if not (self.tab_monitor_ready and self.monitoring_active and self.interview_active):
+            return
+        print(f"[Focus] Interview lost focus ({event['source']}) at {time.strftime('%H:%M:%S', time.localtime(event['time']))}")
+        self.tab_change_detected = True
+        self.proctoring_bus.publish("tab_change", event["source"], detail=event.get("detail"), timestamp=event["time"])
+
+    def _interrupt_for_warning(self):
+        """Cut off an interruptible prompt so an urgent warning can be spoken."""
+        if not self.playback_interruptible:
+            return False
+        self.stop_speaking()
+        return True
 
     def _handle_cheating_attempt(self, cheat_type):
-        """Handle different types of cheating attempts"""
+        """Handle different types of cheating attempts (called by the proctoring scheduler)"""
         self.cheating_warnings += 1
         
         if self.cheating_warnings >= 3:
-            self.speak("Multiple concerning behaviors detected. The interview will now conclude.", interruptible=False)
+            self._speak_notice("Multiple concerning behaviors detected. The interview will now conclude.")
             self.interview_active = False
             return
             
-        responses = {
-            "no_face": "Please ensure your face is clearly visible to the camera for the interview.",
-            "multiple_faces": "I notice multiple people in the frame. Please ensure you're alone during this interview.",
-            "looking_away": "Please maintain focus on the interview and avoid looking at other devices.",
-            "tab_change": "Please stay focused on the interview window and avoid switching to other applications."
-        }
-        
-        if cheat_type in responses:
-            self.speak(f"Gentle reminder: {responses[cheat_type]} This is notice {self.cheating_warnings} of 3.", interruptible=False)
+        if cheat_type in self.CHEATING_REMINDERS:
+            self._speak_notice(self._cheating_reminder(cheat_type, self.cheating_warnings))
+
+    def _speak_notice(self, text):
+        """Speak a proctoring notice; unlike speak(), never consumes a pending barge-in."""
+        print(f"Interviewer: {text}")
+        try:
+            self._play_audio(*self._synthesize(text), interruptible=False)
+        except Exception as e:
+            print(f"TTS error: {e}")
+
+    def _cheating_reminder(self, cheat_type, notice):
+        return f"Gentle reminder: {self.CHEATING_REMINDERS[cheat_type]} This is notice {notice} of 3."
 
     def __del__(self):
         """Clean up resources"""
         self.interview_active = False
         self.monitoring_active = False
         self._stop_camera()
+        if hasattr(self, 'mic_stream'):
+            self.mic_stream.stop()
+        if hasattr(self, 'focus_monitor'):
+            self.focus_monitor.close()
+        if hasattr(self, 'proctoring_scheduler'):
+            self.proctoring_scheduler.stop()
         if hasattr(self, 'face_monitor_thread'):
             self.face_monitor_thread.join(timeout=1)
         if hasattr(self, 'tab_monitor_thread'):
             self.tab_monitor_thread.join(timeout=1)
-        pygame.mixer.quit()
+        # The mixer is left running; other sessions are still using it
+        if getattr(self, 'playback_channel', None) is not None:
+            self.playback_channel.stop()
 
     def speak(self, text, interruptible=True):
-        if self.interrupted:
+        print(f"Interviewer: {text}")
+
+        try:
+            self._play_audio(*self._synthesize(text), interruptible=interruptible)
+        except Exception as e:
+            print(f"TTS error: {e}")
+        finally:
+            # A barge-in only cuts off the utterance it interrupted
             self.interrupted = False
-            return
 
-        print(f"Interviewer: {text}")
+    def _synthesize(self, text):
+        """Return ``(pcm_bytes, sample_rate)`` for ``text`` from the cache or a TTS backend."""
+        return self.tts.synthesize(text)
+
+    def _static_phrases(self):
+        """Every fixed line the interviewer may say, for pre-warming the audio cache."""
+        phrases = list(self.STATIC_PHRASES) + list(self.filler_phrases)
+        for cheat_type in self.CHEATING_REMINDERS:
+            phrases.extend(self._cheating_reminder(cheat_type, notice) for notice in (1, 2))
+        return phrases
+
+    def _play_audio(self, audio, sample_rate, interruptible=False):
+        """Play 16-bit mono PCM from memory and block until it finishes or is stopped."""
+        sound = pcm_to_sound(audio, sample_rate)
+        with self.speech_lock:
+            self.playback_interruptible = interruptible
+            self.playback_done.clear()
+            self.playback_channel = sound.play()
+            # Woken early by stop_speaking(); otherwise the clip length is the completion signal
+            self.playback_done.wait(sound.get_length())
+            self.playback_done.set()
+            self.playback_channel = None
+
+    def stop_speaking(self):
+        """Cut off the utterance currently playing, if any."""
+        channel = self.playback_channel
+        if channel is not None:
+            channel.stop()
+        self.playback_done.set()
+
+    def speak_stream(self, chunks, interruptible=True):
+        """Speak streamed text sentence by sentence and return what was spoken.
+
+        A producer thread cuts ``chunks`` at sentence boundaries and
+        synthesizes each sentence while the previous one is playing, so
+        audio starts after roughly one sentence of generation. If the
+        candidate barges in, generation and synthesis stop and only the
+        sentences played so far are returned.
+        """
+        self.interrupted = False
+        ready = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        spoken = []
+        finished = object()
+
+        def offer(item):
+            # Never block on a consumer that has already returned
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
 
+        def produce():
+            sentences = split_sentences(chunks)
+            try:
+                for sentence in sentences:
+                    if stop.is_set():
+                        break
+                    try:
+                        clip = self._synthesize(sentence)
+                    except Exception as e:
+                        print(f"TTS error: {e}")
+                        clip = None
+                    if not offer((sentence, clip)):
+                        break
+            except Exception as e:
+                print(f"Streaming response error: {e}")
+            finally:
+                # Closing the source cancels the Gemini stream behind it
+                sentences.close()
+                if hasattr(chunks, "close"):
+                    chunks.close()
+                offer(finished)
+
+        threading.Thread(target=produce, daemon=True).start()
         try:
-            response = self.polly.synthesize_speech(
-                Text=text,
-                OutputFormat="mp3",
-                VoiceId="Aditi"
-            )
+            while True:
+                item = ready.get()
+                if item is finished:
+                    break
+                sentence, clip = item
+                print(f"Interviewer: {sentence}")
+                spoken.append(sentence)
+                if clip:
+                    try:
+                        self._play_audio(*clip, interruptible=interruptible)
+                    except Exception as e:
+                        print(f"Audio playback error: {e}")
+                if self.interrupted:
+                    break  # Candidate barged in; leave the rest unspoken
+        finally:
+            stop.set()
+            self.interrupted = False
+        return " ".join(spoken)
+
+    def query_gemini_stream(self, prompt):
+        """Yield Gemini response text as it is generated."""
+        produced = False
+        try:
+            for chunk in self.gemini_client.stream(self.model, prompt):
+                produced = True
+                yield chunk
+        except Exception as e:
+            print(f"Gemini API Error: {e}")
+            if not produced:
+                yield "Could you elaborate on your experience with that technology?"
 
-            if "AudioStream" in response:
-                temp_path = os.path.join(tempfile.gettempdir(), f"polly_{int(time.time() * 1000)}.mp3")
-                with open(temp_path, 'wb') as f:
-                    f.write(response["AudioStream"].read())
+    def _speak_generated(self, prompt, prefix=""):
+        """Generate a response to ``prompt`` and speak it, streaming when enabled."""
+        if not self.streaming_tts:
+            response = self.query_gemini(prompt)
+            if response:
+                self.speak(prefix + response, interruptible=False)
+            return response
 
-                pygame.mixer.music.load(temp_path)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
+        generated = []
 
-                # Safely attempt file removal
-                try:
-                    time.sleep(0.2)  # tiny delay before delete
-                    os.remove(temp_path)
-                except PermissionError:
-                    pass  # Suppress WinError 32
+        def chunks():
+            if prefix:
+                yield prefix
+            for chunk in self.query_gemini_stream(prompt):
+                generated.append(chunk)
+                yield chunk
 
-        except Exception as e:
-            print(f"AWS Polly TTS error: {e}")
+        self.speak_stream(chunks(), interruptible=False)
+        return "".join(generated).strip()
 
     def listen(self, max_attempts=3):
         """Listen for user response with proper context management"""
+        # The capture thread is already recording, so the candidate's first words are never lost
+        self.mic_stream.start()
+        self.interrupted = False
         for attempt in range(max_attempts):
             try:
-                # Create new recognizer instance for this attempt
-                attempt_recognizer = sr.Recognizer()
-                with self.microphone as source:
-                    print("\nListening... (Speak now)")
+                print("\nListening... (Speak now)")
+                
+                try:
+                    # Recognition ran while the candidate was speaking; this is just the final result
+                    text = self.mic_stream.get_transcript(timeout=15)
+                    self.last_candidate_activity = time.time()
+                    print(f"Candidate: {text}")
                     
-                    # Adjust for ambient noise with clean context
-                    attempt_recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                    # Add filler phrase to show active listening
+                    if len(text.split()) > 5:  # Only if substantial response
+                        filler = self._get_filler_phrase()
+                        self.speak(filler, interruptible=False)
                     
-                    try:
-                        audio = attempt_recognizer.listen(
-                            source, 
-                            timeout=15, 
-                            phrase_time_limit=60
-                        )
-                        
-                        text = attempt_recognizer.recognize_google(audio)
-                        print(f"Candidate: {text}")
-                        
-                        # Add filler phrase to show active listening
-                        if len(text.split()) > 5:  # Only if substantial response
-                            filler = self._get_filler_phrase()
-                            self.speak(filler, interruptible=False)
-                        
-                        # Process tone detection
-                        tone = self._detect_tone(text)
-                        if tone != "professional":
-                            self.handle_improper_tone(tone)
-                            placeholder = "[Response had non-professional tone]"
-                            self.conversation_history.append({"role": "user", "content": placeholder})
-                            return placeholder
+                    # Process tone detection
+                    tone = self._detect_tone(text)
+                    if tone != "professional":
+                        self.handle_improper_tone(tone)
+                        placeholder = "[Response had non-professional tone]"
+                        self.conversation_history.append({"role": "user", "content": placeholder})
+                        return placeholder
+                    
+                    if text.strip():
+                        repeat_phrases = [
+                            "can you repeat", "please repeat", 
+                            "repeat the question", "say again",
+                            "pardon", "once more", "come again",
+                            "could you repeat"
+                        ]
+                        lower_text = text.lower()
                         
-                        if text.strip():
-                            repeat_phrases = [
-                                "can you repeat", "please repeat", 
-                                "repeat the question", "say again",
-                                "pardon", "once more", "come again",
-                                "could you repeat"
-                            ]
-                            lower_text = text.lower()
-                            
-                            if any(phrase in lower_text for phrase in repeat_phrases) and self.last_question:
-                                # Special handling for repeat requests
-                                self.speak(f"Sure, here's the question again: {self.last_question}", interruptible=False)
-                                self.wait_after_speaking(self.last_question)
-                                # Return special marker instead of recursive listen()
-                                return "[REPEAT_REQUEST]"
-                            else:
-                                self.conversation_history.append({"role": "user", "content": text})
-                                return text
+                        if any(phrase in lower_text for phrase in repeat_phrases) and self.last_question:
+                            # Special handling for repeat requests
+                            self.speak(f"Sure, here's the question again: {self.last_question}", interruptible=False)
+                            self.wait_after_speaking(self.last_question)
+                            # Return special marker instead of recursive listen()
+                            return "[REPEAT_REQUEST]"
                         else:
-                            placeholder = "[Unclear response]"
-                            self.conversation_history.append({"role": "user", "content": placeholder})
-                            return placeholder
-                            
-                    except sr.WaitTimeoutError:
-                        if attempt < max_attempts - 1:
-                            self.speak("I didn't hear anything. Please speak when you're ready.", interruptible=False)
-                            time.sleep(2)
-                        continue
-                        
-                    except sr.UnknownValueError:
-                        if attempt < max_attempts - 1:
-                            self.speak("I couldn't quite catch that. Could you please repeat?", interruptible=False)
-                            time.sleep(2)
-                        continue
-                        
-                    except sr.RequestError as e:
-                        print(f"Speech recognition error: {e}")
-                        if attempt < max_attempts - 1:
-                            self.speak("There was a technical issue. Please try speaking again.", interruptible=False)
-                            time.sleep(2)
-                        continue
+                            self.conversation_history.append({"role": "user", "content": text})
+                            return text
+                    else:
+                        placeholder = "[Unclear response]"
+                        self.conversation_history.append({"role": "user", "content": placeholder})
+                        return placeholder
                         
+                except sr.WaitTimeoutError:
+                    if attempt < max_attempts - 1:
+                        self.speak("I didn't hear anything. Please speak when you're ready.", interruptible=False)
+                        time.sleep(2)
+                    continue
+                    
+                except sr.UnknownValueError:
+                    if attempt < max_attempts - 1:
+                        self.speak("I couldn't quite catch that. Could you please repeat?", interruptible=False)
+                        time.sleep(2)
+                    continue
+                    
+                except sr.RequestError as e:
+                    print(f"Speech recognition error: {e}")
+                    if attempt < max_attempts - 1:
+                        self.speak("There was a technical issue. Please try speaking again.", interruptible=False)
+                        time.sleep(2)
+                    continue
+                    
             except OSError as e:
                 print(f"Microphone access error: {e}")
                 self.speak("I'm having trouble accessing the microphone. Please check your microphone settings.", interruptible=False)
@@ -813,7 +1008,7 @@ class ExpertTechnicalInterviewer:
         
         Return only the rephrased question."""
         
-        rephrased = self.query_gemini(prompt)
+        rephrased = self.query_gemini(prompt, use_cache=True)
         return rephrased.strip() if rephrased else question
 
     def _detect_tone(self, text):
@@ -865,17 +1060,39 @@ class ExpertTechnicalInterviewer:
             self.speak(response, interruptible=False)
             time.sleep(1)
 
-    def query_gemini(self, prompt):
+    def _response_text(self, response):
+        """Extract the text of a Gemini response, or None if it has none."""
+        if hasattr(response, 'text'):
+            return response.text
+        elif hasattr(response, 'result'):
+            return response.result
+        elif hasattr(response, 'candidates') and response.candidates:
+            return response.candidates[0].content.parts[0].text
+        return None
+
+    def query_gemini(self, prompt, use_cache=False):
+        """Send ``prompt`` to Gemini.
+
+        With ``use_cache=True`` a previous answer to the identical prompt is
+        reused; only call sites with deterministic prompts should opt in.
+        """
+        cache_key = None
+        if use_cache and self.response_cache is not None:
+            cache_key = prompt_fingerprint(self.model_name, prompt)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            response = self.model.generate_content(prompt)
-            if hasattr(response, 'text'):
-                return response.text
-            elif hasattr(response, 'result'):
-                return response.result
-            elif hasattr(response, 'candidates') and response.candidates:
-                return response.candidates[0].content.parts[0].text
-            else:
+            # Deadline, retries and concurrency limits are handled by the shared client
+            response = self.gemini_client.generate(self.model, prompt)
+            text = self._response_text(response)
+            if text is None:
                 return "Could you tell me more about your experience with that?"
+            # Canned fallbacks above are never cached
+            if cache_key and text:
+                self.response_cache.set(cache_key, text)
+            return text
         except Exception as e:
             print(f"Gemini API Error: {e}")
             return "Could you elaborate on your experience with that technology?"
@@ -915,68 +1132,71 @@ class ExpertTechnicalInterviewer:
         else:
             return best_tech_domain[0]
 
-    def _generate_coding_question(self, domain, difficulty="medium"):
-        """Generate a coding question based on the candidate's domain"""
-        domain_mapping = {
-            "python": "Python",
-            "java": "Java", 
-            "cpp": "C++",
-            "frontend": "JavaScript",
-            "backend": "Python or your preferred language",
-            "AI": "Python",
-            "data science": "Python",
-            "machine learning": "Python"
-        }
-        
-        language = domain_mapping.get(domain, "Python")
-        
-        prompt = f"""Generate a {difficulty} level coding problem suitable for a technical interview in {domain}.
-        
-        Requirements:
-        - Should be solvable in {language}
-        - Should take 10-15 minutes to solve
-        - Include a clear problem statement
-        - Provide input/output examples
-        - Should test algorithmic thinking and {domain} knowledge
-        - Avoid problems that are too easy or too hard
-        - Focus on practical problem-solving skills
-        
-        Format your response as:
-        Problem: [Clear problem statement]
-        
-        Example Input: [Sample input]
-        Example Output: [Expected output]
-        
-        Constraints: [Any constraints or edge cases to consider]
-        
-        Generate only the problem, no solution."""
-        
+    def _select_coding_challenge(self, domain, difficulty="medium"):
+        """Pick an unseen challenge from the question bank, preferring skills the candidate mentioned."""
+        said = " ".join(m["content"] for m in self.conversation_history if m.get("role") == "user").lower()
+        tags = [skill for skill in self.tech_domains.get(domain, ()) if skill.lower() in said]
+        challenge = self.question_bank.select(self.candidate_id, domain, difficulty, tags,
+                                              remember=not self.anonymous_candidate)
+        if challenge is not None:
+            return challenge
+        # Nothing banked for this domain yet; the refiller has been asked to stock it
+        return self._generate_coding_challenge(domain, difficulty)
+
+    def _generate_coding_challenge(self, domain, difficulty="medium"):
+        """Generate a coding challenge with a hidden test suite for the candidate's domain.
+
+        Gemini's expected outputs are checked by running its reference
+        solution over the tests; tests it disagrees with are dropped.
+        """
         try:
-            response = self.query_gemini(prompt)
-            return response.strip() if response else None
+            challenge = generate_challenge(self.query_gemini, domain, difficulty, self.tech_domains.get(domain, ()))
+            self.question_bank.add(challenge, seen_by=self.candidate_id, remember=not self.anonymous_candidate)
+            print(f"[Challenges] Generated {challenge.challenge_id} with {len(challenge.tests)} tests")
+            return challenge
         except Exception as e:
             print(f"Error generating coding question: {e}")
-            return self._get_fallback_coding_question(domain)
-
-    def _get_fallback_coding_question(self, domain):
-        """Fallback coding questions if AI generation fails"""
-        fallback_questions = {
-            "python": """Problem: Find the two numbers in a list that add up to a target sum.
+            return self._get_fallback_coding_challenge(domain)
 
-Example Input: numbers = [2, 7, 11, 15], target = 9
-Example Output: [0, 1] (indices of numbers 2 and 7)
-
-Constraints: Each input has exactly one solution, and you may not use the same element twice.""",
-            
-            "default": """Problem: Write a function to reverse words in a sentence while keeping the word order.
+    def _generate_coding_question(self, domain, difficulty="medium"):
+        """Generate a coding question based on the candidate's domain"""
+        return self._generate_coding_challenge(domain, difficulty).prompt_text()
 
-Example Input: "Hello World Python"
-Example Output: "olleH dlroW nohtyP"
+    def _get_fallback_coding_challenge(self, domain):
+        """Fallback coding challenges if AI generation fails"""
+        return FALLBACK_CHALLENGES.get(domain, FALLBACK_CHALLENGES["default"])
 
-Constraints: Preserve spaces between words, handle empty strings gracefully."""
-        }
-        
-        return fallback_questions.get(domain, fallback_questions["default"])
+    def _get_fallback_coding_question(self, domain):
+        """Fallback coding questions if AI generation fails"""
+        return self._get_fallback_coding_challenge(domain).prompt_text()
+
+    def submit_code(self, language, code):
+        """Grade a submission for the current challenge and let the coding round move on."""
+        report = self._grade_submission(language, code)
+        self.submissions.put(report)
+        return report
+
+    def _grade_submission(self, language, code):
+        """Run the candidate's code against every test of the current challenge."""
+        if self.current_challenge is None:
+            raise RuntimeError("No coding challenge is active")
+        extensions = {"Python": ".py", "JavaScript": ".js", "Java": ".java", "C++": ".cpp"}
+        if language not in extensions:
+            raise ValueError(f"Unsupported language: {language}")
+        name = "solution"
+        if language == "Java":
+            # javac requires the file to be named after the public class
+            match = re.search(r"public\s+class\s+(\w+)", code)
+            name = match.group(1) if match else "Main"
+        with tempfile.TemporaryDirectory(prefix="submission-") as tmp:
+            path = os.path.join(tmp, name + extensions[language])
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(code)
+            report = grade(self.current_challenge, language, path)
+        self.coding_results.append(report.to_dict())
+        print(f"[Challenges] {self.current_challenge.challenge_id}: {report.passed}/{report.total} passed "
+              f"in {report.duration:.2f}s ({language})")
+        return report
 
     def _generate_domain_followup(self, context, domain):
         """Generate a context-aware follow-up question for the domain"""
@@ -1074,6 +1294,9 @@ Constraints: Preserve spaces between words, handle empty strings gracefully."""
 
         threading.Thread(target=enable_tab_monitor, daemon=True).start()
 
+        # Open the microphone and calibrate while the welcome message plays
+        self.mic_stream.start()
+
         # Start the interview logic
         interview_thread = threading.Thread(target=self._run_interview_logic)
         interview_thread.daemon = True
@@ -1083,114 +1306,24 @@ Constraints: Preserve spaces between words, handle empty strings gracefully."""
         while self.interview_active:
             time.sleep(1)
 class RAGExpertTechnicalInterviewer(ExpertTechnicalInterviewer):
-    def __init__(self, model="gemini-2.0-flash", accent="indian"):
-        super().__init__(model, accent)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')  # Pre-trained embedding model
-        self.knowledge_base_path = "knowledge_base.json"
-        self.vector_index_path = "vector_index.faiss"
-        self.vector_dimension = 384  # MiniLM-L6 outputs 384-dimensional vectors
-        self.vector_index = self._load_or_create_vector_index()
-        self.knowledge_base = self._load_knowledge_base()
-
-    def _load_or_create_vector_index(self):
-        """Load an existing FAISS index or create a new one."""
-        if os.path.exists(self.vector_index_path):
-            return faiss.read_index(self.vector_index_path)
-        else:
-            return faiss.IndexFlatL2(self.vector_dimension)
+    def __init__(self, model="gemini-2.0-flash", accent="indian", candidate_id=None):
+        super().__init__(model, accent, candidate_id)
+        # The embedding model, FAISS index and texts are shared by every session in the process
+        self.knowledge_store = get_shared_knowledge_base("knowledge_base.jsonl", "vector_index.faiss")
+        self.embedding_model = self.knowledge_store.embedding_model
+        self.vector_dimension = self.knowledge_store.vector_dimension
 
     def _load_knowledge_base(self):
-        if os.path.exists(self.knowledge_base_path):
-            with open(self.knowledge_base_path, "r") as f:
-                return json.load(f)
-        return []
-
-    def _save_knowledge_base(self):
-        with open(self.knowledge_base_path, "w") as f:
-            json.dump(self.knowledge_base, f, indent=4)
-
-    def _save_vector_index(self):
-        faiss.write_index(self.vector_index, self.vector_index_path)
-
-    def _add_to_knowledge_base(self, text):
-        """Add new text to the knowledge base and update the vector index."""
-        embedding = self.embedding_model.encode(text)
-        self.knowledge_base.append({"text": text, "embedding": embedding.tolist()})
-        self.vector_index.add(np.array([embedding]))
-        self._save_knowledge_base()
-        self._save_vector_index()
-
-    def _retrieve_context(self, query, top_k=3):
-        """Retrieve the top-k most relevant documents from the knowledge base."""
-        query_embedding = self.embedding_model.encode(query)
-        distances, indices = self.vector_index.search(np.array([query_embedding]), top_k)
-        retrieved_texts = [self.knowledge_base[i]["text"] for i in indices[0]]
-        return retrieved_texts
-
-    def query_gemini_with_rag(self, prompt, query):
-        """Query the generative model with additional context from the knowledge base."""
-        retrieved_context = self._retrieve_context(query)
-        full_prompt = f"{prompt}\n\nAdditional Context:\n" + "\n".join(retrieved_context)
-        return self.query_gemini(full_prompt)
-
-    def _update_knowledge_base_after_interview(self):
-        """Update the knowledge base with the latest conversation history."""
-        for msg in self.conversation_history:
-            self._add_to_knowledge_base(msg["content"])
-
-    def _run_interview_logic(self):
-        try:
-            super()._run_interview_logic()
-        finally:
-            # Update the knowledge base after the interview ends
-            self._update_knowledge_base_after_interview()
-class RAGExpertTechnicalInterviewer(ExpertTechnicalInterviewer):
-    def __init__(self, model="gemini-2.0-flash", accent="indian"):
-        super().__init__(model, accent)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')  # Pre-trained embedding model
-        self.knowledge_base_path = "knowledge_base.json"
-        self.vector_index_path = "vector_index.faiss"
-        self.vector_dimension = 384  # MiniLM-L6 outputs 384-dimensional vectors
-        self.vector_index = self._load_or_create_vector_index()
-        self.knowledge_base = self._load_knowledge_base()
-
-    def _load_or_create_vector_index(self):
-        """Load an existing FAISS index or create a new one."""
-        if os.path.exists(self.vector_index_path):
-            return faiss.read_index(self.vector_index_path)
-        else:
-            return faiss.IndexFlatL2(self.vector_dimension)
-
-    def _load_knowledge_base(self):
-        """Load the knowledge base from a JSON file."""
-        if os.path.exists(self.knowledge_base_path):
-            with open(self.knowledge_base_path, "r") as f:
-                return json.load(f)
-        return []
-
-    def _save_knowledge_base(self):
-        """Save the knowledge base to a JSON file."""
-        with open(self.knowledge_base_path, "w") as f:
-            json.dump(self.knowledge_base, f, indent=4)
-
-    def _save_vector_index(self):
-        """Save the FAISS index to disk."""
-        faiss.write_index(self.vector_index, self.vector_index_path)
+        """Return a snapshot of the shared knowledge base."""
+        return self.knowledge_store.entries()
 
     def _add_to_knowledge_base(self, text):
-        """Add new text to the knowledge base and update the vector index."""
-        embedding = self.embedding_model.encode(text)
-        self.knowledge_base.append({"text": text, "embedding": embedding.tolist()})
-        self.vector_index.add(np.array([embedding]))
-        self._save_knowledge_base()
-        self._save_vector_index()
+        """Add new text to the knowledge base and update the vector index; returns whether it was stored."""
+        return self.knowledge_store.add(text)
 
     def _retrieve_context(self, query, top_k=3):
         """Retrieve the top-k most relevant documents from the knowledge base."""
-        query_embedding = self.embedding_model.encode(query)
-        distances, indices = self.vector_index.search(np.array([query_embedding]), top_k)
-        retrieved_texts = [self.knowledge_base[i]["text"] for i in indices[0]]
-        return retrieved_texts
+        return self.knowledge_store.search(query, top_k)
 
     def query_gemini_with_rag(self, prompt, query):
         """Query the generative model with additional context from the knowledge base."""
@@ -1200,8 +1333,9 @@ class RAGExpertTechnicalInterviewer(ExpertTechnicalInterviewer):
 
     def _update_knowledge_base_after_interview(self):
         """Update the knowledge base with the latest conversation history."""
-        for msg in self.conversation_history:
-            self._add_to_knowledge_base(msg["content"])
+        # One batched encode, one index add and one flush for the whole transcript
+        added = self.knowledge_store.add_many([msg["content"] for msg in self.conversation_history])
+        print(f"[KnowledgeBase] Added {added} new entries from this interview.")
 
     def _run_interview_logic(self):
         try:
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry time-to-live.
+
+    ``hits``, ``misses`` and ``evictions`` are counted for monitoring.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def prompt_fingerprint(model_name, prompt):
+    """Stable cache key for a prompt sent to ``model_name``."""
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class MemoryResponseCache:
+    """In-process LLM response cache."""
+
+    def __init__(self, maxsize=512, ttl=None):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self.memory.get(key)
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+
+    def stats(self):
+        return self.memory.stats()
+
+
+class SQLiteResponseCache:
+    """LLM response cache persisted in SQLite, fronted by an in-memory LRU.
+
+    Entries older than ``ttl`` seconds are ignored, and the least recently
+    used rows are pruned once the table grows past ``max_entries``.
+    """
+
+    def __init__(self, path="response_cache.sqlite3", ttl=None, max_entries=10000, memory_size=256):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = LRUCache(maxsize=memory_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        self.hits += 1
+        self.memory.set(key, row[0])
+        return row[0]
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory": self.memory.stats(),
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide LLM response cache selected by GEMINI_CACHE_BACKEND.
+
+    ``memory`` (default), ``sqlite`` or ``none``; ``none`` returns None.
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            backend = os.getenv("GEMINI_CACHE_BACKEND", "memory").lower()
+            ttl = float(os.getenv("GEMINI_CACHE_TTL", "86400")) or None
+            if backend == "sqlite":
+                _response_cache = SQLiteResponseCache(
+                    os.getenv("GEMINI_CACHE_PATH", "response_cache.sqlite3"),
+                    ttl=ttl,
+                    max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "10000")),
+                )
+            elif backend == "memory":
+                _response_cache = MemoryResponseCache(int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "512")), ttl=ttl)
+            else:
+                return None
+        return _response_cache
@@ -0,0 +1,402 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from sandbox import get_sandbox
+
+
+class TestCase:
+    """One stdin/stdout test of a coding challenge."""
+
+    def __init__(self, input, expected, name=None, hidden=True):
+        self.input = input
+        self.expected = expected
+        self.name = name
+        self.hidden = hidden
+
+    def to_dict(self):
+        return {"input": self.input, "expected": self.expected, "name": self.name, "hidden": self.hidden}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["input"], data["expected"], data.get("name"), data.get("hidden", True))
+
+
+class Challenge:
+    """A coding problem with a stdin/stdout test suite.
+
+    The example is shown to the candidate and is also the first, visible
+    test. The remaining tests are hidden and only reported as pass/fail.
+    ``compare`` is ``tokens`` (whitespace-insensitive) or ``lines``
+    (line by line, ignoring trailing whitespace).
+    """
+
+    def __init__(self, domain, statement, tests, input_format="", output_format="", example_input="",
+                 example_output="", constraints="", difficulty="medium", compare="tokens",
+                 reference_solution=None, source="generated", challenge_id=None, created_at=None, tags=None):
+        self.domain = domain
+        self.statement = statement
+        self.tests = tests
+        self.input_format = input_format
+        self.output_format = output_format
+        self.example_input = example_input
+        self.example_output = example_output
+        self.constraints = constraints
+        self.difficulty = difficulty
+        self.compare = compare
+        self.reference_solution = reference_solution
+        self.source = source
+        self.tags = list(tags or [])
+        self.created_at = created_at or time.time()
+        for index, test in enumerate(self.tests, 1):
+            test.name = test.name or f"test {index}"
+        self.challenge_id = challenge_id or self._content_id()
+
+    def _content_id(self):
+        content = json.dumps([self.statement, [t.to_dict() for t in self.tests]], sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+    def prompt_text(self):
+        """The problem as read out to the candidate."""
+        text = f"Problem: {self.statement}\n\n"
+        if self.input_format:
+            text += f"Input: {self.input_format}\n"
+        if self.output_format:
+            text += f"Output: {self.output_format}\n"
+        if self.input_format or self.output_format:
+            text += "\n"
+        text += f"Example Input: {self.example_input}\nExample Output: {self.example_output}"
+        if self.constraints:
+            text += f"\n\nConstraints: {self.constraints}"
+        return text
+
+    def to_dict(self):
+        return {
+            "challenge_id": self.challenge_id,
+            "domain": self.domain,
+            "statement": self.statement,
+            "input_format": self.input_format,
+            "output_format": self.output_format,
+            "example_input": self.example_input,
+            "example_output": self.example_output,
+            "constraints": self.constraints,
+            "difficulty": self.difficulty,
+            "compare": self.compare,
+            "tests": [t.to_dict() for t in self.tests],
+            "reference_solution": self.reference_solution,
+            "source": self.source,
+            "created_at": self.created_at,
+            "tags": self.tags,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["domain"], data["statement"], [TestCase.from_dict(t) for t in data["tests"]],
+            data.get("input_format", ""), data.get("output_format", ""), data.get("example_input", ""),
+            data.get("example_output", ""), data.get("constraints", ""), data.get("difficulty", "medium"),
+            data.get("compare", "tokens"), data.get("reference_solution"), data.get("source", "generated"),
+            data.get("challenge_id"), data.get("created_at"), data.get("tags"),
+        )
+
+
+def outputs_match(actual, expected, compare="tokens"):
+    if compare == "lines":
+        def lines(text):
+            rows = [line.rstrip() for line in (text or "").splitlines()]
+            while rows and not rows[-1]:
+                rows.pop()
+            return rows
+        return lines(actual) == lines(expected)
+    return (actual or "").split() == (expected or "").split()
+
+
+class TestResult:
+    def __init__(self, test, status, duration=0.0, max_rss_kb=None, output=None, error=None):
+        self.test = test
+        self.status = status
+        self.duration = duration
+        self.max_rss_kb = max_rss_kb
+        self.output = output
+        self.error = error
+
+    @property
+    def passed(self):
+        return self.status == "passed"
+
+    def to_dict(self):
+        result = {
+            "name": self.test.name,
+            "status": self.status,
+            "passed": self.passed,
+            "hidden": self.test.hidden,
+            "time_ms": round(1000 * self.duration, 1),
+            "peak_memory_kb": self.max_rss_kb,
+        }
+        # Hidden tests only report pass/fail, time and memory
+        if not self.test.hidden:
+            result.update(input=self.test.input, expected=self.test.expected, output=self.output, error=self.error)
+        return result
+
+
+class TestReport:
+    """Per-test outcome of grading one submission."""
+
+    def __init__(self, challenge, language, results, duration, compile_error=None):
+        self.challenge = challenge
+        self.language = language
+        self.results = results
+        self.duration = duration
+        self.compile_error = compile_error
+
+    @property
+    def passed(self):
+        return sum(1 for r in self.results if r.passed)
+
+    @property
+    def total(self):
+        return len(self.results)
+
+    def summary(self):
+        """One or two sentences suitable for reading out."""
+        if self.compile_error is not None:
+            return "Your code didn't compile, so none of the tests could run."
+        text = f"Your solution passed {self.passed} of {self.total} tests."
+        failed = [r for r in self.results if not r.passed]
+        if failed:
+            statuses = {"wrong_answer": "a wrong answer", "runtime_error": "a runtime error", "timeout": "a timeout"}
+            first = failed[0]
+            text += f" The first failure was {statuses.get(first.status, first.status)} on {first.test.name}."
+        return text
+
+    def to_dict(self):
+        return {
+            "challenge_id": self.challenge.challenge_id,
+            "language": self.language,
+            "passed": self.passed,
+            "total": self.total,
+            "duration_ms": round(1000 * self.duration, 1),
+            "compile_error": self.compile_error,
+            "tests": [r.to_dict() for r in self.results],
+        }
+
+
+def grade(challenge, language, file_path, parallel=None, sandbox=None):
+    """Run every test of ``challenge`` against ``file_path`` in one batch.
+
+    Python tests run in one warm worker, which forks a child per test;
+    compiled languages are built once. Up to ``parallel`` tests run at a
+    time (default SANDBOX_TEST_PARALLEL, or the number of cores).
+    """
+    sandbox = sandbox or get_sandbox()
+    parallel = parallel or int(os.getenv("SANDBOX_TEST_PARALLEL", "0")) or os.cpu_count() or 1
+    start = time.perf_counter()
+    runs = sandbox.run_batch(language, file_path, [t.input for t in challenge.tests], parallel=parallel)
+    duration = time.perf_counter() - start
+
+    if runs and runs[0].compile_error is not None:
+        results = [TestResult(t, "compile_error") for t in challenge.tests]
+        return TestReport(challenge, language, results, duration, runs[0].compile_error)
+
+    results = []
+    for test, run in zip(challenge.tests, runs):
+        if run.timed_out:
+            status = "timeout"
+        elif run.returncode != 0:
+            status = "runtime_error"
+        elif outputs_match(run.stdout, test.expected, challenge.compare):
+            status = "passed"
+        else:
+            status = "wrong_answer"
+        results.append(TestResult(test, status, run.duration, run.max_rss_kb, run.stdout, run.stderr or None))
+    return TestReport(challenge, language, results, duration)
+
+
+DOMAIN_LANGUAGES = {
+    "python": "Python",
+    "java": "Java",
+    "cpp": "C++",
+    "frontend": "JavaScript",
+    "backend": "Python or your preferred language",
+    "AI": "Python",
+    "data science": "Python",
+    "machine learning": "Python",
+}
+
+CHALLENGE_PROMPT = """Generate a {difficulty} level coding problem suitable for a technical interview in {domain}.
+
+Requirements:
+- Should be solvable in {language}
+- Should take 10-15 minutes to solve
+- Should test algorithmic thinking and {domain} knowledge
+- Avoid problems that are too easy or too hard
+- The program reads its input from standard input and prints its answer to standard output
+- Include 8 to 10 test cases covering normal cases and edge cases
+- Include a reference solution in Python 3 that reads stdin and prints the answer
+- Tag the problem with 1 to 3 topics it exercises, chosen from: {skills}
+
+Respond with only a JSON object of this shape:
+{{"statement": "...", "input_format": "...", "output_format": "...",
+  "example_input": "...", "example_output": "...", "constraints": "...",
+  "tests": [{{"input": "...", "output": "..."}}],
+  "tags": ["..."], "reference_solution": "..."}}"""
+
+
+def parse_challenge_response(text, domain, difficulty="medium", skills=()):
+    """Build a Challenge from Gemini's JSON answer; raises ValueError if it's unusable."""
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if not match:
+        raise ValueError("no JSON object in response")
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not data.get("statement") or not isinstance(data.get("tests"), list):
+        raise ValueError("missing statement or tests")
+
+    def text_field(value):
+        return value if isinstance(value, str) else json.dumps(value)
+
+    example = TestCase(text_field(data.get("example_input", "")), text_field(data.get("example_output", "")),
+                       name="example", hidden=False)
+    tests = [example] + [
+        TestCase(text_field(t["input"]), text_field(t["output"]))
+        for t in data["tests"] if isinstance(t, dict) and "input" in t and "output" in t
+    ]
+    # Only tags from the domain's skill list are indexed
+    known = {skill.lower(): skill for skill in skills}
+    tags = [known[t.lower()] for t in data.get("tags") or [] if isinstance(t, str) and t.lower() in known]
+    return Challenge(
+        domain, data["statement"], tests, data.get("input_format", ""), data.get("output_format", ""),
+        example.input, example.expected, data.get("constraints", ""), difficulty,
+        reference_solution=data.get("reference_solution"), tags=tags,
+    )
+
+
+def verify_with_reference(challenge, min_tests=4, sandbox=None):
+    """Keep only tests whose expected output the reference solution reproduces.
+
+    Returns False (leaving the challenge unchanged) if there is no
+    reference solution or too few tests survive.
+    """
+    if not challenge.reference_solution:
+        return False
+    with tempfile.TemporaryDirectory(prefix="challenge-") as tmp:
+        path = os.path.join(tmp, "reference.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(challenge.reference_solution)
+        report = grade(challenge, "Python", path, sandbox=sandbox)
+    verified = [r.test for r in report.results if r.passed]
+    if len(verified) < min_tests or verified[0] is not challenge.tests[0]:
+        return False
+    challenge.tests = verified
+    challenge.challenge_id = challenge._content_id()
+    return True
+
+
+def generate_challenge(query, domain, difficulty="medium", skills=()):
+    """Ask the model behind ``query`` (prompt -> text) for a challenge and verify it.
+
+    Raises ValueError if the answer is unusable or its tests can't be confirmed.
+    """
+    prompt = CHALLENGE_PROMPT.format(
+        difficulty=difficulty, domain=domain, language=DOMAIN_LANGUAGES.get(domain, "Python"),
+        skills=", ".join(skills) or domain,
+    )
+    challenge = parse_challenge_response(query(prompt), domain, difficulty, skills)
+    if not verify_with_reference(challenge):
+        raise ValueError("reference solution didn't confirm enough tests")
+    return challenge
+
+
+class ChallengeStore:
+    """Append-only JSONL store of challenges, so a generated suite is reused."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CHALLENGE_STORE_PATH", "challenges.jsonl")
+        self.lock = threading.Lock()
+        self.challenges = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        challenge = Challenge.from_dict(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue  # Torn or malformed line
+                    self.challenges[challenge.challenge_id] = challenge
+
+    def add(self, challenge):
+        with self.lock:
+            if challenge.challenge_id in self.challenges:
+                return
+            self.challenges[challenge.challenge_id] = challenge
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(challenge.to_dict()) + "\n")
+
+    def get(self, challenge_id):
+        return self.challenges.get(challenge_id)
+
+    def for_domain(self, domain):
+        return [c for c in self.challenges.values() if c.domain == domain]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_challenge_store():
+    """Return the process-wide ChallengeStore."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ChallengeStore()
+        return _store
+
+
+FALLBACK_CHALLENGES = {
+    "python": Challenge(
+        "python",
+        "Find the two numbers in a list that add up to a target sum.",
+        [
+            TestCase("2 7 11 15\n9\n", "0 1", name="example", hidden=False),
+            TestCase("3 2 4\n6\n", "1 2"),
+            TestCase("3 3\n6\n", "0 1"),
+            TestCase("1 5 9 13\n22\n", "2 3"),
+            TestCase("-3 4 3 90\n0\n", "0 2"),
+            TestCase("0 4 3 0\n0\n", "0 3"),
+            TestCase("1 2 3 4 5 6 7 8 9 10\n19\n", "8 9"),
+            TestCase("5 75 25\n100\n", "1 2"),
+        ],
+        input_format="The numbers on the first line, separated by spaces, and the target on the second line.",
+        output_format="The indices of the two numbers, in increasing order, separated by a space.",
+        example_input="numbers = [2, 7, 11, 15], target = 9",
+        example_output="0 1 (indices of numbers 2 and 7)",
+        constraints="Each input has exactly one solution, and you may not use the same element twice.",
+        source="fallback",
+    ),
+    "default": Challenge(
+        "default",
+        "Write a function to reverse words in a sentence while keeping the word order.",
+        [
+            TestCase("Hello World Python\n", "olleH dlroW nohtyP", name="example", hidden=False),
+            TestCase("\n", ""),
+            TestCase("a\n", "a"),
+            TestCase("ab  cd\n", "ba  dc"),
+            TestCase("racecar level\n", "racecar level"),
+            TestCase("  leading\n", "  gnidael"),
+            TestCase("Python3 is fun!\n", "3nohtyP si !nuf"),
+            TestCase("12345 678\n", "54321 876"),
+        ],
+        input_format="One line containing the sentence.",
+        output_format="The sentence with every word reversed.",
+        example_input='"Hello World Python"',
+        example_output='"olleH dlroW nohtyP"',
+        constraints="Preserve spaces between words, handle empty strings gracefully.",
+        compare="lines",
+        source="fallback",
+    ),
+}
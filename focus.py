@@ -0,0 +1,285 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+
+LOST_STATES = {"hidden", "blur"}
+FOCUSED_STATES = {"visible", "focus"}
+
+# Foreground windows that don't count as leaving the interview
+IGNORED_TITLES = ("notification", "system", "settings")
+
+
+class FocusMonitor:
+    """Debounced, timestamped record of whether the interview has focus.
+
+    Focus changes are pushed in by event sources: the browser frontend
+    (``visibilitychange``/``blur`` posted to ``/focus_event``) or an
+    OS-level FocusEventSource. Repeated reports of the same state are
+    dropped, so a tab switch that fires both ``blur`` and ``hidden``
+    counts once. A loss of focus is only confirmed, and ``on_focus_lost``
+    called, if focus hasn't come back within ``debounce_ms``.
+    """
+
+    def __init__(self, on_focus_lost, debounce_ms=None, history=500):
+        self.on_focus_lost = on_focus_lost
+        debounce_ms = debounce_ms if debounce_ms is not None else float(os.getenv("FOCUS_DEBOUNCE_MS", "250"))
+        self.debounce = debounce_ms / 1000.0
+        self.lock = threading.Lock()
+        self.focused = True
+        self.lost_event = None
+        self.pending = None
+        self.events = deque(maxlen=history)
+        self.sources = []
+        self.browser_connected = False
+        self.closed = False
+
+    def report(self, state, source="browser", timestamp=None, detail=None):
+        """Record a focus change; returns False if it didn't change the state.
+
+        ``timestamp`` is when the change happened (epoch seconds) as seen by
+        the source; it defaults to the time of receipt.
+        """
+        if state not in LOST_STATES and state not in FOCUSED_STATES:
+            raise ValueError(f"Unknown focus state: {state}")
+        received = time.time()
+        if source == "browser":
+            # The frontend is reporting, so OS polling can stand down
+            self.browser_connected = True
+        focused = state in FOCUSED_STATES
+        with self.lock:
+            if self.closed or focused == self.focused:
+                return False
+            self.focused = focused
+            event = {"time": timestamp or received, "received": received, "state": state, "source": source}
+            if detail:
+                event["detail"] = detail
+            if focused:
+                if self.lost_event is not None:
+                    event["away_seconds"] = round(max(0.0, event["time"] - self.lost_event["time"]), 3)
+                if self.pending is not None:
+                    # Back before the debounce window closed
+                    self.pending.cancel()
+                    self.pending = None
+                    self.lost_event["debounced"] = True
+                self.lost_event = None
+            else:
+                self.lost_event = event
+                self.pending = threading.Timer(self.debounce, self._confirm, args=(event,))
+                self.pending.daemon = True
+                self.pending.start()
+            self.events.append(event)
+        return True
+
+    def _confirm(self, event):
+        with self.lock:
+            if self.closed or self.lost_event is not event:
+                return
+            self.pending = None
+            event["confirmed"] = True
+        try:
+            self.on_focus_lost(event)
+        except Exception as e:
+            print(f"[Focus] Focus-lost handler failed: {e}")
+
+    def add_source(self, source):
+        if self.closed:
+            return
+        self.sources.append(source)
+        source.start()
+
+    def history(self):
+        with self.lock:
+            return [dict(event) for event in self.events]
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            if self.pending is not None:
+                self.pending.cancel()
+                self.pending = None
+        for source in self.sources:
+            source.stop()
+
+
+class FocusEventSource:
+    """OS-level producer of focus changes for a FocusMonitor.
+
+    The window in the foreground when the source starts is taken as the
+    interview window. Switching to another window reports ``blur`` and
+    coming back reports ``focus``.
+    """
+
+    name = "base"
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.initial_title = None
+        self.running = False
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        self.running = False
+
+    def _on_foreground(self, title):
+        if not title or self.initial_title is None:
+            return
+        if title == self.initial_title:
+            self.monitor.report("focus", source=self.name)
+        elif not any(x in title.lower() for x in IGNORED_TITLES):
+            self.monitor.report("blur", source=self.name, detail=title)
+
+
+class WindowPollingSource(FocusEventSource):
+    """Polls the active window title; the fallback when nothing pushes events.
+
+    Polling pauses while the browser frontend is reporting focus events.
+    """
+
+    name = "poll"
+
+    def __init__(self, monitor, interval=None):
+        super().__init__(monitor)
+        import pygetwindow
+
+        self.gw = pygetwindow
+        self.interval = interval or float(os.getenv("FOCUS_POLL_INTERVAL", "3"))
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _active_title(self):
+        window = self.gw.getActiveWindow()
+        return window.title if window else None
+
+    def start(self):
+        try:
+            self.initial_title = self._active_title()
+        except Exception:
+            self.initial_title = None
+        self.running = True
+        self.thread = threading.Thread(target=self._poll, daemon=True)
+        self.thread.start()
+
+    def _poll(self):
+        while self.running and not self.monitor.closed:
+            try:
+                if not self.monitor.browser_connected:
+                    self._on_foreground(self._active_title())
+            except Exception as e:
+                print(f"Window monitoring error: {e}")
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.stopped.set()
+
+
+class WindowsForegroundSource(FocusEventSource):
+    """Foreground-window changes pushed by Windows (``SetWinEventHook``).
+
+    Runs a message loop on its own thread, so nothing wakes up until the
+    foreground window actually changes.
+    """
+
+    name = "win32"
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+
+    def __init__(self, monitor):
+        super().__init__(monitor)
+        if sys.platform != "win32":
+            raise RuntimeError("foreground window events are only available on Windows")
+        import ctypes
+        from ctypes import wintypes
+
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.user32 = ctypes.windll.user32
+        self.thread_id = None
+        self.thread = None
+        self.ready = threading.Event()
+
+    def _title(self, hwnd):
+        length = self.user32.GetWindowTextLengthW(hwnd)
+        buffer = self.ctypes.create_unicode_buffer(length + 1)
+        self.user32.GetWindowTextW(hwnd, buffer, length + 1)
+        return buffer.value
+
+    def start(self):
+        self.initial_title = self._title(self.user32.GetForegroundWindow()) or None
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait(timeout=2)
+
+    def _run(self):
+        ctypes, wintypes = self.ctypes, self.wintypes
+        self.thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+        )
+
+        def callback(hook, event, hwnd, id_object, id_child, event_thread, event_time):
+            try:
+                self._on_foreground(self._title(hwnd))
+            except Exception as e:
+                print(f"Window monitoring error: {e}")
+
+        # Keep a reference so the callback isn't garbage collected
+        self.callback = WinEventProc(callback)
+        hook = self.user32.SetWinEventHook(
+            self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+            0, self.callback, 0, 0, self.WINEVENT_OUTOFCONTEXT,
+        )
+        self.ready.set()
+        if not hook:
+            print("[Focus] SetWinEventHook failed; no OS focus events")
+            return
+        try:
+            msg = wintypes.MSG()
+            while self.running and self.user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                self.user32.TranslateMessage(ctypes.byref(msg))
+                self.user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            self.user32.UnhookWinEvent(hook)
+
+    def stop(self):
+        self.running = False
+        if self.thread_id is not None:
+            self.user32.PostThreadMessageW(self.thread_id, self.WM_QUIT, 0, 0)
+
+
+FOCUS_SOURCES = {
+    "win32": WindowsForegroundSource,
+    "poll": WindowPollingSource,
+}
+
+
+def create_focus_source(monitor, name=None):
+    """Build the OS focus source selected by ``name`` or FOCUS_SOURCE.
+
+    ``auto`` uses Windows foreground events where available and polling
+    elsewhere; ``none`` relies on the browser frontend alone. Returns None
+    if no source can be created.
+    """
+    name = (name or os.getenv("FOCUS_SOURCE", "auto")).lower()
+    if name == "none":
+        return None
+    if name == "auto":
+        candidates = (["win32"] if sys.platform == "win32" else []) + ["poll"]
+    else:
+        candidates = [name] if name == "poll" else [name, "poll"]
+    for candidate in candidates:
+        try:
+            return FOCUS_SOURCES[candidate](monitor)
+        except Exception as e:
+            print(f"[Focus] {candidate} focus source unavailable ({e})")
+    print("[Focus] Relying on browser focus events only")
+    return None
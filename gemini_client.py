@@ -0,0 +1,213 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    TRANSIENT_ERRORS = (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.GatewayTimeout,
+    )
+except ImportError:
+    TRANSIENT_ERRORS = ()
+
+TRANSIENT_ERRORS = TRANSIENT_ERRORS + (asyncio.TimeoutError, ConnectionError)
+
+
+class ClientMetrics:
+    """Latency and failure counters for Gemini calls."""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "in_flight": self.in_flight,
+            }
+        if latencies:
+            stats["latency_p50_ms"] = 1000 * latencies[len(latencies) // 2]
+            stats["latency_p95_ms"] = 1000 * latencies[int(0.95 * (len(latencies) - 1))]
+        return stats
+
+
+class GeminiClient:
+    """Asynchronous Gemini client shared by all interview sessions.
+
+    Requests run on one background event loop, so the underlying gRPC
+    channel is reused. Each call has a deadline, at most ``max_concurrency``
+    calls are in flight, and transient errors are retried with exponential
+    backoff and jitter. ``generate`` is a blocking facade for thread-based
+    callers; ``generate_many`` issues independent prompts in parallel.
+    """
+
+    def __init__(self, max_concurrency=None, timeout=None, max_retries=None, backoff_base=None):
+        self.max_concurrency = max_concurrency or int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        self.timeout = timeout or float(os.getenv("GEMINI_TIMEOUT", "20"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+        self.backoff_base = backoff_base or float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+        self.metrics = ClientMetrics()
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = None
+        started = threading.Event()
+        self.loop_thread = threading.Thread(target=self._run_loop, args=(started,), daemon=True)
+        self.loop_thread.start()
+        started.wait()
+
+    def _run_loop(self, started):
+        asyncio.set_event_loop(self.loop)
+        # The semaphore must be created on the loop that uses it
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.loop.call_soon(started.set)
+        self.loop.run_forever()
+
+    async def generate_async(self, model, prompt, timeout=None, **kwargs):
+        """Call ``model.generate_content_async`` with a deadline and retries."""
+        timeout = timeout or self.timeout
+        with self.metrics.lock:
+            self.metrics.calls += 1
+        async with self.semaphore:
+            with self.metrics.lock:
+                self.metrics.in_flight += 1
+            try:
+                for attempt in range(self.max_retries + 1):
+                    start = time.perf_counter()
+                    try:
+                        response = await asyncio.wait_for(
+                            model.generate_content_async(prompt, request_options={"timeout": timeout}, **kwargs),
+                            timeout,
+                        )
+                    except TRANSIENT_ERRORS as e:
+                        with self.metrics.lock:
+                            if isinstance(e, asyncio.TimeoutError):
+                                self.metrics.timeouts += 1
+                            if attempt < self.max_retries:
+                                self.metrics.retries += 1
+                        if attempt >= self.max_retries:
+                            raise
+                        delay = self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.5)
+                        print(f"[Gemini] Transient error ({type(e).__name__}), retrying in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    with self.metrics.lock:
+                        self.metrics.successes += 1
+                        self.metrics.latencies.append(time.perf_counter() - start)
+                    return response
+            except Exception:
+                with self.metrics.lock:
+                    self.metrics.failures += 1
+                raise
+            finally:
+                with self.metrics.lock:
+                    self.metrics.in_flight -= 1
+
+    def generate(self, model, prompt, timeout=None, **kwargs):
+        """Blocking facade around ``generate_async`` for thread-based callers."""
+        future = asyncio.run_coroutine_threadsafe(self.generate_async(model, prompt, timeout, **kwargs), self.loop)
+        return future.result()
+
+    def generate_many(self, model, prompts, timeout=None):
+        """Run independent prompts concurrently; failures are returned as exceptions."""
+        async def gather():
+            return await asyncio.gather(
+                *(self.generate_async(model, prompt, timeout) for prompt in prompts),
+                return_exceptions=True,
+            )
+        return asyncio.run_coroutine_threadsafe(gather(), self.loop).result()
+
+    def submit(self, model, prompt, timeout=None, **kwargs):
+        """Start a call in the background and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(self.generate_async(model, prompt, timeout, **kwargs), self.loop)
+
+    def stream(self, model, prompt, timeout=None):
+        """Yield text chunks of a streamed response as they arrive (blocking generator).
+
+        Streams are not retried, since part of the answer may already have
+        been consumed; ``timeout`` bounds the wait for each chunk.
+        """
+        timeout = timeout or self.timeout
+        chunks = queue.Queue()
+        finished = object()
+
+        async def produce():
+            with self.metrics.lock:
+                self.metrics.calls += 1
+            try:
+                async with self.semaphore:
+                    response = await asyncio.wait_for(
+                        model.generate_content_async(prompt, stream=True, request_options={"timeout": timeout}),
+                        timeout,
+                    )
+                    async for chunk in response:
+                        try:
+                            text = getattr(chunk, "text", "")
+                        except ValueError:
+                            # A blocked or empty candidate has no text; skip it
+                            continue
+                        if text:
+                            chunks.put(text)
+                with self.metrics.lock:
+                    self.metrics.successes += 1
+            except Exception as e:
+                with self.metrics.lock:
+                    self.metrics.failures += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.metrics.timeouts += 1
+                chunks.put(e)
+            finally:
+                chunks.put(finished)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self.loop)
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    with self.metrics.lock:
+                        self.metrics.timeouts += 1
+                    raise TimeoutError("Timed out waiting for the next streamed chunk")
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # On a timeout, an error or the consumer closing early, stop the producer too
+            future.cancel()
+
+    def stats(self):
+        return self.metrics.stats()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """Return the process-wide GeminiClient."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
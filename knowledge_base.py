@@ -0,0 +1,568 @@
+import atexit
+import json
+import argparse
+import os
+import re
+import threading
+import time
+
+import faiss  # For vector similarity search
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from cache import LRUCache
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Conversation placeholders such as "[Unclear response]" carry no knowledge
+PLACEHOLDER_PATTERN = re.compile(r"^\[[^\]]*\]$")
+
+_embedding_models = {}
+_knowledge_bases = {}
+_registry_lock = threading.Lock()
+
+
+class ReadWriteLock:
+    """Many concurrent readers or a single writer."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            # Waiting writers take precedence so a busy read path can't starve them
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    def read_locked(self):
+        return _LockContext(self.acquire_read, self.release_read)
+
+    def write_locked(self):
+        return _LockContext(self.acquire_write, self.release_write)
+
+
+class _LockContext:
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._release()
+        return False
+
+
+def build_vector_index(index_type, dimension, training_vectors=None):
+    """Create an empty inner-product (cosine on normalized vectors) FAISS index.
+
+    IVF indexes are trained on ``training_vectors``; with too few vectors to
+    train, a Flat index is returned instead.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, int(os.getenv("KB_HNSW_M", "32")), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = int(os.getenv("KB_HNSW_EF_CONSTRUCTION", "80"))
+        index.hnsw.efSearch = int(os.getenv("KB_HNSW_EF_SEARCH", "64"))
+        return index
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        count = 0 if training_vectors is None else len(training_vectors)
+        if count < min_training_size(index_type):
+            return faiss.IndexFlatIP(dimension)
+        # Rule of thumb: ~4*sqrt(N) lists, but never more than the data can train
+        nlist = int(os.getenv("KB_IVF_NLIST", "0")) or max(1, int(4 * np.sqrt(count)))
+        nlist = min(nlist, count // 39 or 1)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            subquantizers = int(os.getenv("KB_IVF_PQ_M", "48"))  # must divide the dimension
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, subquantizers, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(training_vectors)
+        index.nprobe = min(nlist, int(os.getenv("KB_IVF_NPROBE", "8")))
+        return index
+
+    return faiss.IndexFlatIP(dimension)
+
+
+def min_training_size(index_type):
+    """Number of vectors needed before an index of ``index_type`` can be trained."""
+    # PQ with 8-bit codes fits 256 centroids per sub-quantizer
+    return {"ivf_flat": 39, "ivf_pq": 256}.get(index_type, 0)
+
+
+def describe_index(index):
+    """Return the INDEX_TYPES name of a FAISS index, or None for foreign types."""
+    index = faiss.downcast_index(index)
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        return None
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    return None
+
+
+def normalize_rows(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if len(vectors):
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def get_embedding_model(name=DEFAULT_EMBEDDING_MODEL):
+    """Return the process-wide SentenceTransformer for ``name``, loading it once."""
+    with _registry_lock:
+        model = _embedding_models.get(name)
+        if model is None:
+            print(f"[KnowledgeBase] Loading embedding model {name}")
+            model = SentenceTransformer(name)
+            _embedding_models[name] = model
+        return model
+
+
+def get_shared_knowledge_base(knowledge_base_path="knowledge_base.jsonl",
+                              vector_index_path="vector_index.faiss",
+                              model_name=DEFAULT_EMBEDDING_MODEL):
+    """Return the process-wide store for the given files, creating it on first use."""
+    key = (os.path.abspath(knowledge_base_path), os.path.abspath(vector_index_path), model_name)
+    with _registry_lock:
+        store = _knowledge_bases.get(key)
+    if store is None:
+        # Load the model outside the registry lock; it takes the lock itself
+        embedding_model = get_embedding_model(model_name)
+        with _registry_lock:
+            store = _knowledge_bases.get(key)
+            if store is None:
+                store = SharedKnowledgeBase(knowledge_base_path, vector_index_path, embedding_model)
+                _knowledge_bases[key] = store
+                atexit.register(store.close)
+    return store
+
+
+def knowledge_base_stats():
+    """Stats of every knowledge base opened so far, keyed by its text file."""
+    with _registry_lock:
+        stores = list(_knowledge_bases.values())
+    return {store.knowledge_base_path: store.stats() for store in stores}
+
+
+class SharedKnowledgeBase:
+    """Knowledge-base texts plus their FAISS index, shared by all interview sessions.
+
+    Searches hold a read lock and run concurrently; additions take the write
+    lock so the index and the text list never get out of step.
+
+    On disk the store is append-only: ``knowledge_base.jsonl`` holds one text
+    per line and ``knowledge_base.f32`` the matching float32 embedding rows.
+    New entries are buffered and written in fsynced batches, and the FAISS
+    index is only checkpointed every ``checkpoint_every`` additions. Rows
+    written after the last checkpoint are replayed into the index on load.
+
+    Embeddings are L2-normalized and searched by inner product (cosine), with
+    the index type chosen by ``index_type`` / ``KB_INDEX_TYPE``.
+    """
+
+    def __init__(self, knowledge_base_path, vector_index_path, embedding_model, vector_dimension=384,
+                 flush_batch=None, flush_interval=None, checkpoint_every=None, index_type=None):
+        self.knowledge_base_path = knowledge_base_path
+        self.embeddings_path = os.path.splitext(knowledge_base_path)[0] + ".f32"
+        self.legacy_knowledge_base_path = os.path.splitext(knowledge_base_path)[0] + ".json"
+        self.vector_index_path = vector_index_path
+        self.embedding_model = embedding_model
+        self.vector_dimension = vector_dimension  # MiniLM-L6 outputs 384-dimensional vectors
+        self.flush_batch = flush_batch or int(os.getenv("KB_FLUSH_BATCH", "32"))
+        self.flush_interval = flush_interval or float(os.getenv("KB_FLUSH_INTERVAL", "2.0"))
+        self.checkpoint_every = checkpoint_every or int(os.getenv("KB_CHECKPOINT_EVERY", "256"))
+        self.index_type = index_type or os.getenv("KB_INDEX_TYPE", "flat").lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown KB_INDEX_TYPE {self.index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+        self.query_cache = LRUCache(maxsize=int(os.getenv("KB_QUERY_CACHE_SIZE", "2048")),
+                                    ttl=float(os.getenv("KB_QUERY_CACHE_TTL", "3600")) or None)
+        self.lock = ReadWriteLock()
+        self.io_lock = threading.Lock()
+        self.pending = []
+        self.unsaved_index_rows = 0
+
+        self._migrate_legacy_knowledge_base()
+        self.texts = self._load_knowledge_base()
+        self.text_set = set(self.texts)
+        self.vector_index = self._load_or_create_vector_index()
+
+        self.text_log = open(self.knowledge_base_path, "ab")
+        self.embedding_log = open(self.embeddings_path, "ab")
+        self.flush_requested = threading.Event()
+        self.closed = False
+        self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flush_thread.start()
+
+    def _migrate_legacy_knowledge_base(self):
+        """Convert a pre-existing knowledge_base.json into the append-only files once."""
+        if os.path.exists(self.knowledge_base_path) or not os.path.exists(self.legacy_knowledge_base_path):
+            return
+        print(f"[KnowledgeBase] Migrating {self.legacy_knowledge_base_path} to append-only storage")
+        with open(self.legacy_knowledge_base_path, "r") as f:
+            legacy = json.load(f)
+        texts = [entry["text"] for entry in legacy]
+        embeddings = np.array([entry["embedding"] for entry in legacy], dtype="float32")
+        embeddings = embeddings.reshape(len(texts), self.vector_dimension)
+        with open(self.embeddings_path, "wb") as f:
+            f.write(embeddings.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.knowledge_base_path, "wb") as f:
+            f.write(b"".join(self._encode_text_record(text) for text in texts))
+            f.flush()
+            os.fsync(f.fileno())
+        # The old index was built from the same rows; drop it so it is rebuilt consistently
+        if os.path.exists(self.vector_index_path):
+            os.remove(self.vector_index_path)
+
+    def _load_knowledge_base(self):
+        """Load the text log, truncating both files to the last complete record."""
+        texts = []
+        line_ends = [0]
+        if os.path.exists(self.knowledge_base_path):
+            with open(self.knowledge_base_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Torn write from a crash
+                    try:
+                        texts.append(json.loads(line)["text"])
+                    except (ValueError, KeyError):
+                        break
+                    line_ends.append(line_ends[-1] + len(line))
+
+        row_bytes = self.vector_dimension * 4
+        embedding_rows = os.path.getsize(self.embeddings_path) // row_bytes if os.path.exists(self.embeddings_path) else 0
+        count = min(len(texts), embedding_rows)
+        valid_bytes = line_ends[count]
+        texts = texts[:count]
+
+        if os.path.exists(self.knowledge_base_path) and os.path.getsize(self.knowledge_base_path) != valid_bytes:
+            os.truncate(self.knowledge_base_path, valid_bytes)
+        if os.path.exists(self.embeddings_path) and os.path.getsize(self.embeddings_path) != count * row_bytes:
+            os.truncate(self.embeddings_path, count * row_bytes)
+        return texts
+
+    def _load_embeddings(self, start=0, stop=None):
+        """Memory-map persisted embedding rows ``start:stop``."""
+        count = len(self.texts) if stop is None else stop
+        if count <= start:
+            return np.empty((0, self.vector_dimension), dtype="float32")
+        rows = np.memmap(self.embeddings_path, dtype="float32", mode="r",
+                         shape=(count, self.vector_dimension))
+        return np.array(rows[start:count])
+
+    def _load_or_create_vector_index(self):
+        """Load the last FAISS checkpoint and replay any rows appended after it."""
+        vector_index = None
+        if os.path.exists(self.vector_index_path):
+            vector_index = faiss.read_index(self.vector_index_path)
+            if describe_index(vector_index) != self._effective_index_type(len(self.texts)):
+                # Legacy L2 index or a different KB_INDEX_TYPE: migrate by rebuilding
+                print(f"[KnowledgeBase] Rebuilding vector index as {self.index_type}")
+                vector_index = None
+            elif vector_index.ntotal > len(self.texts):
+                # Checkpoint is ahead of the logs (e.g. logs truncated); rebuild from scratch
+                vector_index = None
+
+        if vector_index is None:
+            vector_index = self._build_index_from_rows()
+        else:
+            missing = normalize_rows(self._load_embeddings(vector_index.ntotal))
+            if len(missing):
+                vector_index.add(missing)
+                self.unsaved_index_rows += len(missing)
+        return vector_index
+
+    def _effective_index_type(self, count):
+        """IVF indexes start out as Flat until there is enough data to train them."""
+        if count < min_training_size(self.index_type):
+            return "flat"
+        return self.index_type
+
+    def _build_index_from_rows(self):
+        embeddings = normalize_rows(self._load_embeddings())
+        vector_index = build_vector_index(self.index_type, self.vector_dimension, embeddings)
+        if len(embeddings):
+            vector_index.add(embeddings)
+            self.unsaved_index_rows += len(embeddings)
+        return vector_index
+
+    def rebuild_index(self, index_type=None):
+        """Rebuild the index from the embedding log, optionally switching its type."""
+        with self.lock.write_locked():
+            self.flush()
+            if index_type:
+                if index_type not in INDEX_TYPES:
+                    raise ValueError(f"Unknown index type {index_type!r}")
+                self.index_type = index_type
+            self.vector_index = self._build_index_from_rows()
+        self.checkpoint()
+
+    @staticmethod
+    def _encode_text_record(text):
+        return (json.dumps({"text": text}) + "\n").encode("utf-8")
+
+    def entries(self):
+        """Return a snapshot of the stored entries."""
+        with self.lock.read_locked():
+            return [{"text": text} for text in self.texts]
+
+    def add(self, text):
+        """Add new text to the knowledge base and update the vector index.
+
+        Returns False if nothing was stored (a placeholder, empty text or a duplicate).
+        """
+        return self.add_many([text], flush=False) > 0
+
+    def add_many(self, texts, batch_size=None, flush=True):
+        """Embed and index ``texts`` in one batch, skipping placeholders and duplicates.
+
+        Returns the number of texts actually added.
+        """
+        with self.lock.read_locked():
+            known = self.text_set
+            candidates = []
+            seen = set()
+            for text in texts:
+                text = (text or "").strip()
+                if not text or PLACEHOLDER_PATTERN.match(text) or text in known or text in seen:
+                    continue
+                seen.add(text)
+                candidates.append(text)
+        if not candidates:
+            return 0
+
+        batch_size = batch_size or int(os.getenv("KB_EMBED_BATCH_SIZE", "64"))
+        embeddings = self.embedding_model.encode(candidates, batch_size=batch_size,
+                                                 convert_to_numpy=True, normalize_embeddings=True)
+        embeddings = np.asarray(embeddings, dtype="float32").reshape(len(candidates), self.vector_dimension)
+
+        with self.lock.write_locked():
+            # Another session may have added the same text while we were encoding
+            keep = [i for i, text in enumerate(candidates) if text not in self.text_set]
+            if not keep:
+                return 0
+            candidates = [candidates[i] for i in keep]
+            embeddings = embeddings[keep]
+            self.texts.extend(candidates)
+            self.text_set.update(candidates)
+            self.vector_index.add(embeddings)
+            with self.io_lock:
+                self.pending.extend(zip(candidates, embeddings))
+                self.unsaved_index_rows += len(candidates)
+                batch_full = len(self.pending) >= self.flush_batch
+        if flush:
+            self.flush()
+        elif batch_full:
+            self.flush_requested.set()
+        return len(candidates)
+
+    def flush(self):
+        """Append buffered entries to the text and embedding logs and fsync them."""
+        with self.io_lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, []
+            # Embeddings go first: on load, text lines without a row are dropped
+            self.embedding_log.write(b"".join(embedding.tobytes() for _, embedding in pending))
+            self.embedding_log.flush()
+            os.fsync(self.embedding_log.fileno())
+            self.text_log.write(b"".join(self._encode_text_record(text) for text, _ in pending))
+            self.text_log.flush()
+            os.fsync(self.text_log.fileno())
+
+    def checkpoint(self):
+        """Write the FAISS index to disk so a restart replays only newer rows."""
+        # The read lock keeps writers out, so the logs and the index agree while saving
+        with self.lock.read_locked():
+            self.flush()
+            with self.io_lock:
+                if not self.unsaved_index_rows:
+                    return
+                temp_path = self.vector_index_path + ".tmp"
+                faiss.write_index(self.vector_index, temp_path)
+                os.replace(temp_path, self.vector_index_path)
+                self.unsaved_index_rows = 0
+
+    def _flush_loop(self):
+        while not self.closed:
+            self.flush_requested.wait(self.flush_interval)
+            self.flush_requested.clear()
+            try:
+                self.flush()
+                if self.unsaved_index_rows >= self.checkpoint_every:
+                    if describe_index(self.vector_index) != self._effective_index_type(len(self.texts)):
+                        # Enough rows have arrived to train the configured IVF index
+                        self.rebuild_index()
+                    else:
+                        self.checkpoint()
+            except Exception as e:
+                print(f"[KnowledgeBase] Persistence error: {e}")
+
+    def close(self):
+        """Flush pending entries and checkpoint the index."""
+        if self.closed:
+            return
+        self.closed = True
+        # Let the background flusher finish before the final flush and closing the logs
+        self.flush_requested.set()
+        if self.flush_thread is not threading.current_thread():
+            self.flush_thread.join()
+        try:
+            self.checkpoint()
+        finally:
+            self.text_log.close()
+            self.embedding_log.close()
+
+    def stats(self):
+        with self.lock.read_locked():
+            entries = len(self.texts)
+            indexed = self.vector_index.ntotal
+        return {
+            "entries": entries,
+            "indexed": indexed,
+            "index_type": describe_index(self.vector_index),
+            "pending_writes": len(self.pending),
+            "query_cache": self.query_cache.stats(),
+        }
+
+    def embed_query(self, query):
+        """Embed a search query, reusing cached embeddings for repeated queries."""
+        # Case and whitespace don't change what is being asked
+        key = " ".join(query.lower().split())
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = np.asarray(self.embedding_model.encode(query, normalize_embeddings=True), dtype="float32")
+            self.query_cache.set(key, embedding)
+        return embedding
+
+    def search(self, query, top_k=3):
+        """Retrieve the top-k most relevant texts for ``query``."""
+        query_embedding = self.embed_query(query)
+        with self.lock.read_locked():
+            if self.vector_index.ntotal == 0:
+                return []
+            distances, indices = self.vector_index.search(np.array([query_embedding], dtype="float32"), top_k)
+            # FAISS pads with -1 when fewer than top_k vectors are stored
+            return [self.texts[i] for i in indices[0] if 0 <= i < len(self.texts)]
+
+
+def benchmark_index_types(embeddings, index_types=INDEX_TYPES, num_queries=200, top_k=3, noise=0.05, seed=0):
+    """Measure recall@k and query latency of each index type against exact Flat search."""
+    rng = np.random.default_rng(seed)
+    embeddings = normalize_rows(embeddings)
+    picks = rng.integers(0, len(embeddings), size=num_queries)
+    queries = embeddings[picks] + noise * rng.standard_normal((num_queries, embeddings.shape[1])).astype("float32")
+    queries = normalize_rows(queries)
+
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    exact.add(embeddings)
+    _, truth = exact.search(queries, top_k)
+
+    results = []
+    for index_type in index_types:
+        build_start = time.perf_counter()
+        index = build_vector_index(index_type, embeddings.shape[1], embeddings)
+        index.add(embeddings)
+        build_seconds = time.perf_counter() - build_start
+
+        latencies = []
+        hits = 0
+        for i in range(num_queries):
+            start = time.perf_counter()
+            _, found = index.search(queries[i:i + 1], top_k)
+            latencies.append(time.perf_counter() - start)
+            hits += len(set(found[0]) & set(truth[i]))
+        latencies.sort()
+        results.append({
+            "index_type": index_type,
+            "built_as": describe_index(index),
+            "build_s": build_seconds,
+            "recall": hits / float(num_queries * top_k),
+            "mean_ms": 1000 * sum(latencies) / len(latencies),
+            "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Knowledge-base index maintenance")
+    parser.add_argument("--knowledge-base", default="knowledge_base.jsonl")
+    parser.add_argument("--vector-index", default="vector_index.faiss")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild", help="Rebuild or migrate the FAISS index from the embedding log")
+    rebuild.add_argument("--index-type", choices=INDEX_TYPES, default=os.getenv("KB_INDEX_TYPE", "flat"))
+
+    bench = commands.add_parser("bench", help="Recall-vs-latency benchmark against the Flat baseline")
+    bench.add_argument("--index-types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--top-k", type=int, default=3)
+    bench.add_argument("--synthetic", type=int, default=0,
+                       help="Benchmark on N random vectors instead of the stored embeddings")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        # No embedding model is needed to rebuild from stored rows
+        store = SharedKnowledgeBase(args.knowledge_base, args.vector_index, None, index_type=args.index_type)
+        store.rebuild_index(args.index_type)
+        store.close()
+        print(f"Rebuilt {args.vector_index} as {describe_index(store.vector_index)} "
+              f"with {store.vector_index.ntotal} vectors")
+        return
+
+    if args.synthetic:
+        embeddings = np.random.default_rng(1).standard_normal((args.synthetic, 384)).astype("float32")
+    else:
+        store = SharedKnowledgeBase(args.knowledge_base, args.vector_index, None)
+        embeddings = store._load_embeddings()
+        store.close()
+    if not len(embeddings):
+        print("No embeddings to benchmark; use --synthetic N")
+        return
+
+    print(f"{len(embeddings)} vectors, {args.queries} queries, top_k={args.top_k}")
+    print(f"{'index':<10} {'built as':<10} {'build s':>8} {'recall':>7} {'mean ms':>8} {'p95 ms':>8}")
+    for row in benchmark_index_types(embeddings, args.index_types, args.queries, args.top_k):
+        print(f"{row['index_type']:<10} {str(row['built_as']):<10} {row['build_s']:>8.3f} "
+              f"{row['recall']:>7.3f} {row['mean_ms']:>8.3f} {row['p95_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from vision import AttentionEventTracker, FaceAttentionAnalyzer, create_face_detector
+
+
+_worker_settings = {}
+
+
+def _init_worker(detector_name, detection_fps, scale):
+    # One OpenCV thread per process; parallelism comes from the pool
+    cv2.setNumThreads(1)
+    _worker_settings.update(detector=create_face_detector(detector_name), detection_fps=detection_fps, scale=scale)
+
+
+def analyze_chunk(path, start_frame, end_frame, fps):
+    """Analyze frames [start_frame, end_frame) of ``path``.
+
+    Returns the per-sample observations so events can be derived in order
+    across chunk boundaries by the parent.
+    """
+    analyzer = FaceAttentionAnalyzer(
+        _worker_settings["detector"],
+        detection_fps=_worker_settings["detection_fps"],
+        scale=_worker_settings["scale"],
+    )
+    capture = cv2.VideoCapture(path)
+    if start_frame:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    observations = []
+    frames = 0
+    try:
+        for index in range(start_frame, end_frame):
+            timestamp = index / fps
+            if not analyzer.due(timestamp):
+                # Advance without converting the frame
+                if not capture.grab():
+                    break
+                frames += 1
+                continue
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames += 1
+            result = analyzer.analyze(frame, now=timestamp)
+            observations.append({
+                "time": timestamp,
+                "face_count": result["face_count"],
+                "multiple_faces": result["multiple_faces"],
+                "looking_away": result["looking_away"],
+            })
+    finally:
+        capture.release()
+    return observations, frames
+
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+
+
+def video_chunks(path, chunk_seconds):
+    """Split ``path`` into (start_frame, end_frame) ranges of ``chunk_seconds``."""
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise OSError(f"Cannot open video {path}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        capture.release()
+    if frame_count <= 0:
+        # Some containers don't report a length; analyze in a single pass
+        return fps, [(0, 2 ** 31)]
+    step = max(1, int(chunk_seconds * fps))
+    return fps, [(start, min(start + step, frame_count)) for start in range(0, frame_count, step)]
+
+
+def events_from_observations(path, observations):
+    """Apply the live monitor's warning logic to time-ordered observations."""
+    tracker = AttentionEventTracker()
+    events = []
+    for observation in observations:
+        for cheat_type in tracker.update(observation):
+            events.append({
+                "video": os.path.basename(path),
+                "time": round(observation["time"], 3),
+                "timestamp": format_timestamp(observation["time"]),
+                "event": cheat_type,
+                "face_count": observation["face_count"],
+            })
+    return events
+
+
+def audit_videos(paths, out_dir="proctoring_logs", workers=None, chunk_seconds=60,
+                 detector=None, detection_fps=None, scale=None):
+    """Analyze recorded interviews across a process pool and write one event log per video.
+
+    Logs are JSON lines named ``<video>.events.jsonl`` in ``out_dir``.
+    Returns a dict mapping each video to its events.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    plans = {}
+    for path in paths:
+        try:
+            plans[path] = video_chunks(path, chunk_seconds)
+        except OSError as e:
+            print(f"[Proctor] Skipping {path}: {e}")
+
+    chunk_results = {path: {} for path in plans}
+    total_frames = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(detector, detection_fps, scale)) as pool:
+        futures = {}
+        for path, (fps, chunks) in plans.items():
+            for number, (first, last) in enumerate(chunks):
+                futures[pool.submit(analyze_chunk, path, first, last, fps)] = (path, number)
+
+        for future in as_completed(futures):
+            path, number = futures[future]
+            try:
+                observations, frames = future.result()
+            except Exception as e:
+                print(f"[Proctor] Chunk {number} of {path} failed: {e}")
+                observations, frames = [], 0
+            chunk_results[path][number] = observations
+            total_frames += frames
+
+    all_events = {}
+    for path, chunks in chunk_results.items():
+        observations = [obs for number in sorted(chunks) for obs in chunks[number]]
+        events = events_from_observations(path, observations)
+        log_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".events.jsonl")
+        with open(log_path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        all_events[path] = events
+        print(f"[Proctor] {path}: {len(events)} events, {len(observations)} samples -> {log_path}")
+
+    elapsed = time.perf_counter() - start
+    if elapsed > 0:
+        print(f"[Proctor] {len(plans)} videos, {total_frames} frames in {elapsed:.1f}s "
+              f"({total_frames / elapsed:.0f} frames/s on {workers} workers)")
+    return all_events
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline proctoring of recorded interview videos")
+    parser.add_argument("videos", nargs="+", help="Video files or glob patterns")
+    parser.add_argument("--out-dir", default="proctoring_logs")
+    parser.add_argument("--workers", type=int, default=None, help="Processes to use (default: all cores)")
+    parser.add_argument("--chunk-seconds", type=float, default=60)
+    parser.add_argument("--detector", default=None, help="Face detector backend (default: FACE_DETECTOR)")
+    parser.add_argument("--fps", type=float, default=None, help="Detections per second of video")
+    parser.add_argument("--scale", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    paths = []
+    for pattern in args.videos:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    audit_videos(paths, args.out_dir, args.workers, args.chunk_seconds, args.detector, args.fps, args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from difflib import SequenceMatcher
+
+
+class Draft:
+    def __init__(self, words, future):
+        self.words = words
+        self.future = future
+        self.started = time.monotonic()
+        self.finished = None
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.finished = time.monotonic()
+
+
+def answer_similarity(a, b):
+    """Word-level similarity (0..1) of two transcripts, ignoring case."""
+    return SequenceMatcher(None, [w.lower() for w in a], [w.lower() for w in b], autojunk=False).ratio()
+
+
+class QuestionPrefetcher:
+    """Drafts the next interview question while the candidate is still answering.
+
+    While armed, each streaming ASR hypothesis passed to ``update`` may
+    start a draft: ``build_prompt(partial)`` is sent through ``submit``
+    (prompt -> Future) without waiting. A new draft replaces the previous
+    one once the hypothesis has grown by ``redraft_growth`` (a fraction of
+    its words) since that draft.
+
+    When the answer is final, ``take`` returns the draft if it was written
+    from a hypothesis at least ``similarity`` similar to the answer,
+    waiting up to ``wait`` seconds for it to finish. Otherwise it returns
+    None and the caller generates the question as usual.
+    """
+
+    def __init__(self, submit, to_text=None, min_words=None, redraft_growth=None, similarity=None, wait=None):
+        self.submit = submit
+        self.to_text = to_text or (lambda response: response)
+        self.min_words = min_words or int(os.getenv("PREFETCH_MIN_WORDS", "8"))
+        self.redraft_growth = redraft_growth or float(os.getenv("PREFETCH_REDRAFT_GROWTH", "0.5"))
+        self.similarity = similarity or float(os.getenv("PREFETCH_SIMILARITY", "0.75"))
+        self.wait = wait if wait is not None else float(os.getenv("PREFETCH_WAIT", "2"))
+        self.enabled = os.getenv("PREFETCH", "1") == "1"
+        self.lock = threading.Lock()
+        self.build_prompt = None
+        self.draft = None
+        self.drafts = 0
+        self.reused = 0
+        self.stale = 0
+        self.missing = 0
+        self.failed = 0
+        self.discarded = 0
+        self.hidden_latency = 0.0
+
+    def arm(self, build_prompt):
+        """Start drafting from partial transcripts; drops any earlier draft."""
+        with self.lock:
+            self.build_prompt = build_prompt if self.enabled else None
+            self._drop()
+
+    def disarm(self):
+        """Stop starting new drafts; the current one is kept for ``take``."""
+        with self.lock:
+            self.build_prompt = None
+
+    def _drop(self):
+        if self.draft is not None:
+            self.draft.future.cancel()
+            self.discarded += 1
+            self.draft = None
+
+    def update(self, partial):
+        """Called with each streaming ASR hypothesis; never blocks on the model."""
+        words = (partial or "").split()
+        with self.lock:
+            if self.build_prompt is None or len(words) < self.min_words:
+                return
+            if self.draft is not None and len(words) < len(self.draft.words) * (1 + self.redraft_growth):
+                return
+            try:
+                future = self.submit(self.build_prompt(partial))
+            except Exception as e:
+                print(f"[Prefetch] Could not start a draft: {e}")
+                return
+            if self.draft is not None:
+                # Superseded by a draft from a longer hypothesis
+                self.draft.future.cancel()
+            self.draft = Draft(words, future)
+            self.drafts += 1
+
+    def take(self, answer):
+        """Return the drafted question for ``answer``, or None to regenerate.
+
+        ``answer`` is None when the turn didn't produce a usable answer;
+        any draft is then discarded.
+        """
+        with self.lock:
+            self.build_prompt = None
+            draft, self.draft = self.draft, None
+            if answer is None:
+                if draft is not None:
+                    draft.future.cancel()
+                    self.discarded += 1
+                return None
+            if draft is None:
+                self.missing += 1
+                return None
+        similarity = answer_similarity(draft.words, answer.split())
+        if similarity < self.similarity:
+            # The answer went somewhere the draft didn't see
+            draft.future.cancel()
+            with self.lock:
+                self.stale += 1
+            print(f"[Prefetch] Regenerating; answer changed since the draft (similarity {similarity:.2f})")
+            return None
+        taken = time.monotonic()
+        try:
+            text = self.to_text(draft.future.result(timeout=self.wait))
+        except Exception as e:
+            draft.future.cancel()
+            with self.lock:
+                self.failed += 1
+            print(f"[Prefetch] Draft unusable ({type(e).__name__}); regenerating")
+            return None
+        if not text or not text.strip():
+            with self.lock:
+                self.failed += 1
+            return None
+        hidden = min(draft.finished or taken, taken) - draft.started
+        with self.lock:
+            self.reused += 1
+            self.hidden_latency += hidden
+        print(f"[Prefetch] Reusing draft (similarity {similarity:.2f}, {hidden:.2f}s of generation hidden)")
+        return text
+
+    def stats(self):
+        with self.lock:
+            answers = self.reused + self.stale + self.missing + self.failed
+            return {
+                "drafts": self.drafts,
+                "reused": self.reused,
+                "stale": self.stale,
+                "missing": self.missing,
+                "failed": self.failed,
+                "discarded": self.discarded,
+                "reuse_rate": round(self.reused / answers, 3) if answers else None,
+                "hidden_latency_s": round(self.hidden_latency, 3),
+            }
@@ -0,0 +1,164 @@
+import itertools
+import os
+import queue
+import threading
+import time
+
+
+# Lower is more urgent
+EVENT_PRIORITIES = {
+    "multiple_faces": 0,
+    "tab_change": 1,
+    "looking_away": 2,
+}
+
+
+class ProctoringEvent:
+    """Something a monitor observed, e.g. a second face or a tab switch."""
+
+    _sequence = itertools.count()
+
+    def __init__(self, kind, source, detail=None, timestamp=None, priority=None):
+        self.kind = kind
+        self.source = source
+        self.detail = detail
+        self.timestamp = timestamp or time.time()
+        self.priority = priority if priority is not None else EVENT_PRIORITIES.get(kind, len(EVENT_PRIORITIES))
+        # Ties are served in publication order
+        self.sequence = next(self._sequence)
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "source": self.source,
+            "detail": self.detail,
+            "timestamp": self.timestamp,
+            "priority": self.priority,
+        }
+
+
+class ProctoringEventBus:
+    """Thread-safe priority queue that monitors publish proctoring events to."""
+
+    def __init__(self):
+        self.queue = queue.PriorityQueue()
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, kind, source, detail=None, timestamp=None):
+        event = ProctoringEvent(kind, source, detail, timestamp)
+        with self.lock:
+            self.published += 1
+        self.queue.put(event)
+        return event
+
+    def get(self, timeout=None):
+        """Return the most urgent pending event, or None after ``timeout``."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        """Return every pending event, most urgent first."""
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class ProctoringScheduler:
+    """The single consumer that turns proctoring events into spoken warnings.
+
+    Runs on its own thread, so monitors only publish events and never talk.
+    Events that arrive within ``settle`` seconds of each other are handled as
+    one batch and coalesced into one warning per kind. A kind that was
+    already warned about within ``cooldown`` seconds is dropped.
+
+    Before delivering, the scheduler waits for its turn. Events at or
+    above ``interrupt_priority`` (numerically lower or equal) cut off an
+    interruptible prompt. Everything else waits, up to ``max_delay``
+    seconds, until the interviewer has finished speaking and the candidate
+    isn't mid-sentence.
+    """
+
+    def __init__(self, bus, deliver, is_speaking, interrupt, is_listening=None,
+                 settle=0.3, cooldown=None, max_delay=None, interrupt_priority=0):
+        self.bus = bus
+        self.deliver = deliver
+        self.is_speaking = is_speaking
+        self.interrupt = interrupt
+        self.is_listening = is_listening or (lambda: False)
+        self.settle = settle
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv("PROCTOR_COOLDOWN", "10"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("PROCTOR_MAX_DELAY", "8"))
+        self.interrupt_priority = interrupt_priority
+        self.last_delivered = {}
+        self.delivered = 0
+        self.coalesced = 0
+        self.interrupts = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def _run(self):
+        while self.running:
+            event = self.bus.get(timeout=0.5)
+            if event is None:
+                continue
+            # Let a burst (e.g. several monitors noticing the same thing) settle
+            time.sleep(self.settle)
+            batch = sorted([event] + self.bus.drain())
+
+            by_kind = {}
+            for event in batch:
+                by_kind.setdefault(event.kind, []).append(event)
+            for kind, events in sorted(by_kind.items(), key=lambda item: item[1][0]):
+                if not self.running:
+                    return
+                self.coalesced += len(events) - 1
+                last = self.last_delivered.get(kind)
+                if last is not None and time.monotonic() - last < self.cooldown:
+                    self.coalesced += 1
+                    continue
+                self._wait_for_turn(events[0])
+                try:
+                    self.deliver(kind, events)
+                except Exception as e:
+                    print(f"[Proctoring] Failed to deliver {kind} warning: {e}")
+                self.delivered += 1
+                self.last_delivered[kind] = time.monotonic()
+
+    def _wait_for_turn(self, event):
+        if event.priority <= self.interrupt_priority and self.is_speaking():
+            if self.interrupt():
+                self.interrupts += 1
+                return
+        deadline = time.monotonic() + self.max_delay
+        while self.running and time.monotonic() < deadline and (self.is_speaking() or self.is_listening()):
+            time.sleep(0.05)
+
+    def stats(self):
+        return {
+            "published": self.bus.published,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "interrupts": self.interrupts,
+            "pending": self.bus.queue.qsize(),
+        }
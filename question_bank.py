@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from challenges import generate_challenge, get_challenge_store
+
+
+TECH_DOMAINS = {
+    "frontend": ["React", "Angular", "Vue", "JavaScript", "TypeScript", "CSS", "HTML5"],
+    "backend": ["Node.js", "Django", "Spring", "Go", "Rust", "Microservices", "APIs"],
+    "AI": ["TensorFlow", "PyTorch", "NLP", "Computer Vision", "LLMs", "Generative AI"],
+    "data science": [ "data science","Pandas", "NumPy", "SQL", "Data Visualization", "ETL", "Big Data"],
+    "machine learning": ["machine learning","Scikit-learn", "Keras", "Model Deployment", "Feature Engineering"],
+    "devops": ["Docker", "Kubernetes", "AWS", "CI/CD", "Terraform", "Monitoring"],
+    "mobile": ["Flutter", "React Native", "Swift", "Kotlin", "Mobile UX"],
+    "python": ["Python", "Flask", "FastAPI", "Django", "Data Structures", "Algorithms"],
+    "java": ["Java", "Spring Boot", "JVM", "Object Oriented Programming", "Collections"],
+    "cpp": ["C++", "STL", "Memory Management", "Object Oriented Programming", "Data Structures"]
+}
+
+
+def gemini_query(model):
+    """Adapt a Gemini model to the prompt -> text callable generate_challenge takes."""
+    from gemini_client import get_gemini_client
+
+    def query(prompt):
+        return get_gemini_client().generate(model, prompt).text
+    return query
+
+
+class QuestionBank:
+    """Pre-generated coding challenges, indexed for constant-time selection.
+
+    Challenges from the ChallengeStore are indexed by (domain, difficulty)
+    and by (domain, difficulty, tag). ``select`` picks a random challenge
+    the candidate hasn't been given yet. When a bucket holds fewer than
+    ``min_stock`` challenges, or a candidate has nearly exhausted it, the
+    background refiller generates more, up to ``target_stock``.
+
+    Which challenges each candidate was given is kept for the
+    ``max_candidates`` most recently active candidates. For named
+    candidates it is also appended to ``seen_path``, so repeats are still
+    avoided after a restart.
+    """
+
+    def __init__(self, store=None, min_stock=None, target_stock=None, domains=None,
+                 max_candidates=None, seen_path=None):
+        self.store = store or get_challenge_store()
+        self.min_stock = min_stock or int(os.getenv("QUESTION_BANK_MIN_STOCK", "3"))
+        self.target_stock = max(self.min_stock, target_stock or int(os.getenv("QUESTION_BANK_TARGET_STOCK", "6")))
+        self.domains = domains or TECH_DOMAINS
+        self.lock = threading.Lock()
+        self.by_key = {}
+        self.by_tag = {}
+        self.max_candidates = max_candidates or int(os.getenv("QUESTION_BANK_MAX_CANDIDATES", "10000"))
+        self.seen_path = seen_path or os.path.splitext(self.store.path)[0] + ".seen.jsonl"
+        self.seen = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failed = 0
+        self.refills = queue.Queue()
+        self.pending = set()
+        self.query = None
+        self.thread = None
+        for challenge in list(self.store.challenges.values()):
+            self._index(challenge)
+        self._load_seen()
+
+    def _load_seen(self):
+        if not os.path.exists(self.seen_path):
+            return
+        records = 0
+        with open(self.seen_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn line
+                records += 1
+                self._seen_set(record["candidate_id"]).add(record["challenge_id"])
+        kept = sum(len(ids) for ids in self.seen.values())
+        if records > 2 * kept:
+            # Mostly evicted candidates; rewrite the log with what is kept
+            temp_path = self.seen_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for candidate_id, ids in self.seen.items():
+                    for challenge_id in ids:
+                        f.write(json.dumps({"candidate_id": candidate_id, "challenge_id": challenge_id}) + "\n")
+            os.replace(temp_path, self.seen_path)
+
+    def _seen_set(self, candidate_id):
+        # Least recently active candidates are evicted first
+        seen = self.seen.pop(candidate_id, None) or set()
+        self.seen[candidate_id] = seen
+        while len(self.seen) > self.max_candidates:
+            self.seen.popitem(last=False)
+        return seen
+
+    def _mark_seen(self, candidate_id, challenge_id, remember):
+        self._seen_set(candidate_id).add(challenge_id)
+        if remember:
+            with open(self.seen_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"candidate_id": candidate_id, "challenge_id": challenge_id}) + "\n")
+
+    def forget(self, candidate_id):
+        """Drop a candidate's in-memory history, e.g. when an anonymous session ends."""
+        with self.lock:
+            self.seen.pop(candidate_id, None)
+
+    def _index(self, challenge):
+        key = (challenge.domain, challenge.difficulty)
+        self.by_key.setdefault(key, []).append(challenge.challenge_id)
+        for tag in challenge.tags:
+            self.by_tag.setdefault(key + (tag,), []).append(challenge.challenge_id)
+
+    def add(self, challenge, seen_by=None, remember=True):
+        """Store and index ``challenge``; ``seen_by`` marks it as given to that candidate.
+
+        With ``remember`` the mark is also written to the seen log.
+        """
+        with self.lock:
+            if self.store.get(challenge.challenge_id) is None:
+                self.store.add(challenge)
+                self._index(challenge)
+            if seen_by is not None:
+                self._mark_seen(seen_by, challenge.challenge_id, remember)
+
+    def stock(self, domain, difficulty="medium"):
+        return len(self.by_key.get((domain, difficulty), ()))
+
+    def _pick(self, ids, seen):
+        # A few random probes find an unseen challenge in O(1) unless the
+        # candidate has seen most of the bucket; then scan once
+        for _ in range(8):
+            challenge_id = random.choice(ids)
+            if challenge_id not in seen:
+                return challenge_id, False
+        unseen = [i for i in ids if i not in seen]
+        return (random.choice(unseen) if unseen else None), True
+
+    def select(self, candidate_id, domain, difficulty="medium", tags=(), remember=True):
+        """Return an unseen challenge for the candidate, or None if the bank has none.
+
+        Buckets for ``tags`` are tried in order before the whole domain.
+        ``remember=False`` keeps the choice out of the seen log, for
+        candidates that won't come back under the same ID.
+        """
+        with self.lock:
+            seen = self._seen_set(candidate_id)
+            buckets = [self.by_tag.get((domain, difficulty, tag)) for tag in tags]
+            buckets.append(self.by_key.get((domain, difficulty)))
+            choice, scanned = None, False
+            for ids in buckets:
+                if ids:
+                    choice, scanned = self._pick(ids, seen)
+                    if choice is not None:
+                        break
+            if choice is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._mark_seen(candidate_id, choice, remember)
+        if choice is None or scanned:
+            # This candidate has (nearly) exhausted the bucket; grow it past the target
+            self.request_refill(domain, difficulty, grow=True)
+        elif self.stock(domain, difficulty) < self.min_stock:
+            self.request_refill(domain, difficulty)
+        return self.store.get(choice) if choice else None
+
+    def request_refill(self, domain, difficulty="medium", grow=False):
+        with self.lock:
+            if self.query is None or (domain, difficulty) in self.pending:
+                return
+            self.pending.add((domain, difficulty))
+        self.refills.put((domain, difficulty, grow))
+
+    def start_refiller(self, query, difficulties=("medium",)):
+        """Top up every domain in the background using ``query`` (prompt -> text)."""
+        with self.lock:
+            self.query = query
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._refill_loop, daemon=True)
+            self.thread.start()
+        for domain in self.domains:
+            for difficulty in difficulties:
+                if self.stock(domain, difficulty) < self.min_stock:
+                    self.request_refill(domain, difficulty)
+
+    def _refill_loop(self):
+        while True:
+            domain, difficulty, grow = self.refills.get()
+            try:
+                count = self.target_stock - self.stock(domain, difficulty)
+                if grow:
+                    count = max(count, self.min_stock)
+                self.fill(domain, difficulty, count)
+            except Exception as e:
+                # Keep the refiller alive; the bucket is retried on the next request
+                print(f"[QuestionBank] Refilling {difficulty} {domain} failed: {e}")
+            finally:
+                with self.lock:
+                    self.pending.discard((domain, difficulty))
+
+    def fill(self, domain, difficulty="medium", count=1, query=None):
+        """Generate and verify ``count`` challenges; returns how many were added."""
+        query = query or self.query
+        added = 0
+        # Allow some failed generations, but don't loop on a broken model
+        for _ in range(2 * max(0, count)):
+            if added >= count:
+                break
+            try:
+                challenge = generate_challenge(query, domain, difficulty, self.domains.get(domain, ()))
+            except Exception as e:
+                with self.lock:
+                    self.failed += 1
+                print(f"[QuestionBank] Generating a {difficulty} {domain} challenge failed: {e}")
+                continue
+            self.add(challenge)
+            with self.lock:
+                self.generated += 1
+            added += 1
+        if added:
+            print(f"[QuestionBank] Added {added} {difficulty} {domain} challenges "
+                  f"(stock {self.stock(domain, difficulty)})")
+        return added
+
+    def stats(self):
+        with self.lock:
+            return {
+                "stock": {f"{domain}/{difficulty}": len(ids) for (domain, difficulty), ids in self.by_key.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+                "generated": self.generated,
+                "failed": self.failed,
+                "pending_refills": len(self.pending),
+                "candidates": len(self.seen),
+            }
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """Return the process-wide QuestionBank."""
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = QuestionBank()
+        return _bank
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate and inspect the coding question bank")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fill = sub.add_parser("fill", help="Generate and verify challenges offline")
+    fill.add_argument("--domains", default=",".join(TECH_DOMAINS), help="Comma-separated domains")
+    fill.add_argument("--difficulty", default="medium")
+    fill.add_argument("--count", type=int, default=None, help="Challenges per domain (default: up to the target stock)")
+    fill.add_argument("--model", default="gemini-2.0-flash")
+    sub.add_parser("stats", help="Show the stock per domain")
+    args = parser.parse_args(argv)
+
+    bank = get_question_bank()
+    if args.command == "stats":
+        for key, count in sorted(bank.stats()["stock"].items()):
+            print(f"{key:30s} {count}")
+        return
+
+    import google.generativeai as genai
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    query = gemini_query(genai.GenerativeModel(args.model))
+    start = time.perf_counter()
+    for domain in args.domains.split(","):
+        domain = domain.strip()
+        count = args.count if args.count is not None else bank.target_stock - bank.stock(domain, args.difficulty)
+        bank.fill(domain, args.difficulty, count, query=query)
+    print(f"[QuestionBank] Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,789 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Imported once by each warm Python worker so submissions don't pay for them
+PYTHON_PRELOAD = ("collections", "itertools", "functools", "heapq", "bisect", "math", "re", "json", "string", "typing")
+
+MAX_OUTPUT_BYTES = 64 * 1024
+
+
+def apply_limits(cpu_seconds, memory_mb, file_size_mb=16):
+    """Cap CPU time, address space and file size of the current process (POSIX only)."""
+    if resource is None:
+        return
+    if cpu_seconds:
+        cpu = int(cpu_seconds) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    if memory_mb:
+        memory = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    if file_size_mb:
+        size = int(file_size_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (size, size))
+
+
+# Sets the same limits as apply_limits in the child and execs the command,
+# since preexec_fn isn't safe to use from a threaded server. POSIX sh counts
+# ``ulimit -f`` in 512-byte blocks and ``ulimit -v`` in KB.
+LIMIT_WRAPPER = 'ulimit -t "$1" && ulimit -v "$2" && ulimit -f "$3" && shift 3 && exec "$@"'
+
+
+def limited_command(command, cpu_seconds, memory_mb, file_size_mb=16):
+    """Wrap ``command`` so it runs under CPU, address space and file size limits."""
+    cpu = str(int(cpu_seconds) + 1) if cpu_seconds else "unlimited"
+    memory = str(int(memory_mb) * 1024) if memory_mb else "unlimited"
+    blocks = str(int(file_size_mb) * 2048) if file_size_mb else "unlimited"
+    return ["/bin/sh", "-c", LIMIT_WRAPPER, "sandbox", cpu, memory, blocks, *command]
+
+
+def _read_capped(path):
+    with open(path, "rb") as f:
+        data = f.read(MAX_OUTPUT_BYTES + 1)
+    text = data[:MAX_OUTPUT_BYTES].decode("utf-8", errors="replace")
+    if len(data) > MAX_OUTPUT_BYTES:
+        text += "\n[output truncated]"
+    return text
+
+
+class SandboxResult:
+    """Outcome of running one submission."""
+
+    def __init__(self, stdout="", stderr="", returncode=0, timed_out=False, duration=0.0,
+                 compile_error=None, timeout=None, max_rss_kb=None):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.duration = duration
+        self.compile_error = compile_error
+        self.timeout = timeout
+        self.max_rss_kb = max_rss_kb
+
+    @property
+    def ok(self):
+        return self.compile_error is None and not self.timed_out and self.returncode == 0
+
+    def format_output(self):
+        """The text shown to the candidate, in the format _execute_code always used."""
+        if self.compile_error is not None:
+            return f"Compile Error:\n{self.compile_error}"
+        if self.timed_out:
+            return f"Error: Code execution timed out ({self.timeout:g} seconds limit)"
+        output = ""
+        if self.stdout:
+            output += f"Output:\n{self.stdout}\n"
+        if self.stderr:
+            output += f"Errors:\n{self.stderr}\n"
+        return output if output else "Code executed successfully (no output)."
+
+    def to_dict(self):
+        return {
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+            "returncode": self.returncode,
+            "timed_out": self.timed_out,
+            "duration": self.duration,
+            "compile_error": self.compile_error,
+            "max_rss_kb": self.max_rss_kb,
+        }
+
+
+def _redirect(stdin_path, stdout_path, stderr_path):
+    """Point fds 0-2 of the current process at the given files."""
+    for fd, name, flags in ((0, stdin_path, os.O_RDONLY),
+                            (1, stdout_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+                            (2, stderr_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)):
+        opened = os.open(name, flags, 0o600)
+        os.dup2(opened, fd)
+        os.close(opened)
+
+
+def _exec_submission(path, files, timeout, memory_mb):
+    """Body of a forked child: run ``path`` as __main__ and exit. Never returns."""
+    import runpy
+    import traceback
+
+    code = 1
+    try:
+        os.setpgid(0, 0)
+        _redirect(*files)
+        apply_limits(timeout, memory_mb)
+        os.chdir(os.path.dirname(path))
+        sys.argv = [path]
+        runpy.run_path(path, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException as e:
+        # Start the traceback at the submission, hiding the sandbox's own frames
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != path:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _kill_after(pid, timeout):
+    """Start a timer that kills ``pid``'s process group; returns (timer, fired_event)."""
+    fired = threading.Event()
+
+    def kill():
+        fired.set()
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    timer = threading.Timer(timeout, kill)
+    timer.daemon = True
+    timer.start()
+    return timer, fired
+
+
+def _wait_measured(pid, timer, fired, start, files):
+    """Reap ``pid`` and collect its exit status, output, wall time and peak RSS."""
+    try:
+        _, status, usage = os.wait4(pid, 0)
+    finally:
+        timer.cancel()
+    return {
+        "returncode": os.waitstatus_to_exitcode(status),
+        "stdout": _read_capped(files[1]),
+        "stderr": _read_capped(files[2]),
+        "timed_out": fired.is_set(),
+        "duration": time.perf_counter() - start,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        "max_rss_kb": usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss,
+    }
+
+
+def _run_forked_batch(job):
+    """Run one Python submission once per input, each in a forked, rlimited child.
+
+    Up to ``parallel`` children run at a time.
+    """
+    path = os.path.abspath(job["path"])
+    timeout = job["timeout"]
+    inputs = job["inputs"]
+    parallel = max(1, job.get("parallel") or 1)
+    results = [None] * len(inputs)
+    with tempfile.TemporaryDirectory(prefix="sandbox-") as tmp:
+        for first in range(0, len(inputs), parallel):
+            running = []
+            for index in range(first, min(first + parallel, len(inputs))):
+                files = tuple(os.path.join(tmp, f"{index}.{name}") for name in ("stdin", "stdout", "stderr"))
+                with open(files[0], "w") as f:
+                    f.write(inputs[index] or "")
+                sys.stdout.flush()
+                sys.stderr.flush()
+                start = time.perf_counter()
+                pid = os.fork()
+                if pid == 0:
+                    _exec_submission(path, files, timeout, job.get("memory_mb"))
+                running.append((index, pid, start, files) + _kill_after(pid, timeout))
+            for index, pid, start, files, timer, fired in running:
+                results[index] = _wait_measured(pid, timer, fired, start, files)
+    return results
+
+
+def python_worker_main():
+    """Entry point of a warm Python worker: one JSON job per stdin line, one JSON result per stdout line."""
+    for module in PYTHON_PRELOAD:
+        __import__(module)
+    for line in sys.stdin:
+        job = json.loads(line)
+        try:
+            results = _run_forked_batch(job)
+        except Exception as e:
+            error = {"returncode": 1, "stdout": "", "stderr": f"Sandbox error: {e}", "timed_out": False,
+                     "duration": 0.0, "max_rss_kb": None}
+            results = [error] * len(job["inputs"])
+        sys.stdout.write(json.dumps(results) + "\n")
+        sys.stdout.flush()
+
+
+class PythonWorker:
+    """A pre-started interpreter that forks a fresh, limited child per submission."""
+
+    def __init__(self, memory_mb):
+        self.memory_mb = memory_mb
+        self.runs = 0
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, path, inputs, timeout, parallel=1):
+        """Run ``path`` once per entry of ``inputs``; returns a list of SandboxResults."""
+        self.runs += 1
+        job = {"path": path, "inputs": inputs, "timeout": timeout, "memory_mb": self.memory_mb, "parallel": parallel}
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("sandbox worker exited unexpectedly")
+        return [SandboxResult(timeout=timeout, **result) for result in json.loads(line)]
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except Exception:
+            self.process.kill()
+
+
+class WorkerPool:
+    """Fixed-size pool of warm workers, each replaced after ``max_runs`` submissions."""
+
+    def __init__(self, factory, size, max_runs, wait=None):
+        self.factory = factory
+        self.size = size
+        self.max_runs = max_runs
+        self.wait = wait or float(os.getenv("SANDBOX_WORKER_WAIT", "5"))
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.missing = 0
+        self.recycled = 0
+        self.closed = False
+        for _ in range(size):
+            self._spawn()
+
+    def _spawn(self):
+        # Start replacements off the caller's path
+        def start():
+            try:
+                self.idle.put(self.factory())
+            except Exception as e:
+                with self.lock:
+                    self.missing += 1
+                print(f"[Sandbox] Failed to start worker: {e}")
+        threading.Thread(target=start, daemon=True).start()
+
+    def run(self, *args):
+        """Run on an idle worker; raises queue.Empty if none frees up within ``wait`` seconds."""
+        try:
+            worker = self.idle.get(timeout=self.wait)
+        except queue.Empty:
+            with self.lock:
+                retry = self.missing > 0 and not self.closed
+                if retry:
+                    self.missing -= 1
+            if retry:
+                # A worker failed to start earlier; try again for later callers
+                self._spawn()
+            raise
+        healthy = False
+        try:
+            result = worker.run(*args)
+            healthy = True
+            return result
+        finally:
+            if healthy and worker.alive() and worker.runs < self.max_runs and not self.closed:
+                self.idle.put(worker)
+            else:
+                worker.close()
+                self.recycled += 1
+                if not self.closed:
+                    self._spawn()
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class LanguageStats:
+    """Throughput and latency of sandbox runs for one language."""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.first_start = None
+        self.last_finish = None
+        self.latencies = deque(maxlen=window)
+
+    def record(self, result, start, finish):
+        with self.lock:
+            self.runs += 1
+            if result.timed_out:
+                self.timeouts += 1
+            elif not result.ok:
+                self.failures += 1
+            if self.first_start is None:
+                self.first_start = start
+            self.last_finish = finish
+            self.latencies.append(finish - start)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {"runs": self.runs, "failures": self.failures, "timeouts": self.timeouts}
+            if self.runs and self.last_finish > self.first_start:
+                stats["runs_per_second"] = self.runs / (self.last_finish - self.first_start)
+        if latencies:
+            stats["latency_p50_ms"] = 1000 * latencies[len(latencies) // 2]
+            stats["latency_p95_ms"] = 1000 * latencies[int(0.95 * (len(latencies) - 1))]
+        return stats
+
+
+class BuildEnvironmentError(Exception):
+    """A build failed for reasons other than the source (missing compiler, IO); never cached."""
+
+
+class CompilationTimeout(BuildEnvironmentError):
+    """Raised when a compiler exceeds its time limit; such results aren't cached."""
+
+
+# Compiler output that points at the machine rather than the submission
+ENVIRONMENT_ERRORS = (
+    "No space left on device", "cannot open output file", "Permission denied",
+    "Cannot allocate memory", "Read-only file system",
+)
+
+
+_compiler_versions = {}
+_compiler_versions_lock = threading.Lock()
+
+
+def compiler_version(command, flag="--version"):
+    """First line of ``command``'s version banner, cached per process."""
+    with _compiler_versions_lock:
+        if command not in _compiler_versions:
+            try:
+                completed = subprocess.run([command, flag], capture_output=True, text=True, timeout=10)
+                banner = (completed.stdout or completed.stderr).strip()
+                _compiler_versions[command] = banner.splitlines()[0] if banner else command
+            except (OSError, subprocess.TimeoutExpired):
+                _compiler_versions[command] = command
+        return _compiler_versions[command]
+
+
+class CompileCache:
+    """Content-addressed on-disk cache of build outputs.
+
+    Entries are keyed by a hash of the language, compiler version, flags,
+    file name and source, and each one is a directory holding the compiled
+    artifacts, or the compiler's error output for sources that failed to
+    build. Entries are trimmed least recently used first to ``max_bytes``.
+    Entries used in the last ``grace_seconds`` are kept, since a program
+    may still be running from them.
+    """
+
+    ERROR_FILE = "compile_error.txt"
+    # Bumped when entries written by older versions must not be reused
+    FORMAT = "2"
+
+    def __init__(self, directory=None, max_bytes=None, grace_seconds=120):
+        # Absolute, since compilers run from the submission's directory
+        self.directory = os.path.abspath(
+            directory or os.getenv("SANDBOX_BUILD_CACHE_DIR", os.path.join(".cache", "builds"))
+        )
+        self.max_bytes = max_bytes or int(os.getenv("SANDBOX_BUILD_CACHE_BYTES", str(512 * 1024 * 1024)))
+        self.grace_seconds = grace_seconds
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(language, compiler, flags, file_name, source):
+        digest = hashlib.sha256()
+        for part in (CompileCache.FORMAT, language, compiler, " ".join(flags), file_name):
+            digest.update(part.encode("utf-8") + b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _key_lock(self, key):
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _read_error(self, entry):
+        try:
+            with open(os.path.join(entry, self.ERROR_FILE), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def build(self, key, compile):
+        """Return ``(entry_dir, compile_error)``, compiling on a miss.
+
+        ``compile(output_dir)`` writes artifacts into ``output_dir`` and
+        returns None, or returns the compiler's error text.
+        BuildEnvironmentError (including CompilationTimeout) propagates
+        and nothing is cached.
+        """
+        entry = os.path.join(self.directory, key)
+        with self._key_lock(key):
+            if os.path.isdir(entry):
+                os.utime(entry)  # Mark as recently used for eviction
+                with self.lock:
+                    self.hits += 1
+                return entry, self._read_error(entry)
+
+            with self.lock:
+                self.misses += 1
+            staging = tempfile.mkdtemp(prefix=key + ".", suffix=".tmp", dir=self.directory)
+            try:
+                error = compile(staging)
+                if error is not None:
+                    with open(os.path.join(staging, self.ERROR_FILE), "w", encoding="utf-8") as f:
+                        f.write(error)
+                try:
+                    os.replace(staging, entry)
+                except OSError:
+                    # Another process published the same entry first
+                    shutil.rmtree(staging, ignore_errors=True)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+        with self.lock:
+            self.key_locks.pop(key, None)
+        self._trim()
+        return entry, error
+
+    def _trim(self):
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                mtime = os.stat(path).st_mtime
+                if name.endswith(".tmp"):
+                    # Left behind by a process that died mid-build
+                    if now - mtime > 3600:
+                        shutil.rmtree(path, ignore_errors=True)
+                    continue
+                size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+                entries.append((mtime, size, path))
+                total += size
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if now - mtime < self.grace_seconds:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+        except OSError as e:
+            print(f"[Sandbox] Could not trim build cache: {e}")
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CodeSandbox:
+    """Runs candidate code with time and memory limits.
+
+    Python submissions go to a pool of warm worker interpreters (POSIX
+    only) that fork a limited child per run and are recycled after
+    ``max_runs``. Java and C++ are compiled with a timeout into a private
+    build directory, so nothing is written next to the source. Every
+    process gets RLIMIT_CPU/RLIMIT_AS caps; the JVM gets ``-Xmx`` instead,
+    since it reserves far more address space than it uses.
+    """
+
+    LANGUAGES = ("Python", "Java", "C++", "JavaScript")
+
+    def __init__(self, workers=None, max_runs=None, timeout=None, compile_timeout=None, memory_mb=None):
+        self.workers = workers or int(os.getenv("SANDBOX_WORKERS", "2"))
+        self.max_runs = max_runs or int(os.getenv("SANDBOX_MAX_RUNS", "50"))
+        self.timeout = timeout or float(os.getenv("SANDBOX_TIMEOUT", "10"))
+        self.compile_timeout = compile_timeout or float(os.getenv("SANDBOX_COMPILE_TIMEOUT", "30"))
+        self.memory_mb = memory_mb or int(os.getenv("SANDBOX_MEMORY_MB", "512"))
+        self.language_stats = {language: LanguageStats() for language in self.LANGUAGES}
+        self.build_cache = CompileCache()
+        self.python_pool = None
+        if hasattr(os, "fork"):
+            self.python_pool = WorkerPool(lambda: PythonWorker(self.memory_mb), self.workers, self.max_runs)
+
+    def run(self, language, file_path, stdin=None):
+        """Compile if needed and run ``file_path`` once; returns a SandboxResult.
+
+        Raises ValueError for an unsupported language.
+        """
+        return self.run_batch(language, file_path, [stdin])[0]
+
+    def run_batch(self, language, file_path, inputs, parallel=1):
+        """Compile once and run ``file_path`` once per stdin text in ``inputs``.
+
+        Python inputs go to one warm worker, which forks a child per input;
+        other languages start a process per input. Up to ``parallel`` run
+        at the same time. Returns one SandboxResult per input, in order.
+        """
+        if language not in self.LANGUAGES:
+            raise ValueError(f"Unsupported language: {language}")
+        file_path = os.path.abspath(file_path)
+        start = time.perf_counter()
+        try:
+            results = None
+            if language == "Python" and self.python_pool is not None:
+                try:
+                    results = self.python_pool.run(file_path, list(inputs), self.timeout, parallel)
+                except queue.Empty:
+                    print("[Sandbox] No warm Python worker available; running in a new process")
+            if results is None:
+                results = self._run_processes(language, file_path, list(inputs), parallel)
+        except Exception as e:
+            results = [SandboxResult(stderr=f"Runtime error: {e}", returncode=1, timeout=self.timeout)
+                       for _ in inputs]
+        finish = time.perf_counter()
+        for result in results:
+            latency = result.duration or (finish - start)
+            self.language_stats[language].record(result, finish - latency, finish)
+        return results
+
+    def _run_processes(self, language, file_path, inputs, parallel):
+        prepare = {
+            "Python": self._prepare_python,
+            "Java": self._prepare_java,
+            "C++": self._prepare_cpp,
+            "JavaScript": self._prepare_javascript,
+        }[language]
+        command, memory_mb, error = prepare(file_path)
+        if error:
+            return [error for _ in inputs]
+        cwd = os.path.dirname(file_path)
+        if parallel <= 1 or len(inputs) <= 1:
+            return [self._command(command, cwd, stdin, self.timeout, memory_mb) for stdin in inputs]
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            return list(pool.map(lambda stdin: self._command(command, cwd, stdin, self.timeout, memory_mb), inputs))
+
+    def _command(self, command, cwd, stdin, timeout, memory_mb):
+        """Run a command with rlimits in its own process group, measuring its peak memory."""
+        if not hasattr(os, "wait4"):
+            start = time.perf_counter()
+            try:
+                completed = subprocess.run(command, cwd=cwd, input=stdin or "", capture_output=True,
+                                           text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                return SandboxResult(timed_out=True, duration=time.perf_counter() - start, timeout=timeout)
+            return SandboxResult(completed.stdout[:MAX_OUTPUT_BYTES], completed.stderr[:MAX_OUTPUT_BYTES],
+                                 completed.returncode, duration=time.perf_counter() - start, timeout=timeout)
+
+        with tempfile.TemporaryDirectory(prefix="sandbox-") as tmp:
+            files = tuple(os.path.join(tmp, name) for name in ("stdin", "stdout", "stderr"))
+            with open(files[0], "w") as f:
+                f.write(stdin or "")
+            with open(files[0], "rb") as stdin_file, open(files[1], "wb") as stdout_file, \
+                    open(files[2], "wb") as stderr_file:
+                start = time.perf_counter()
+                process = subprocess.Popen(
+                    limited_command(command, timeout, memory_mb), cwd=cwd,
+                    stdin=stdin_file, stdout=stdout_file, stderr=stderr_file, start_new_session=True,
+                )
+            # Reap it ourselves: wait4 also reports the child's peak memory
+            result = _wait_measured(process.pid, *_kill_after(process.pid, timeout), start, files)
+            process.returncode = result["returncode"]
+        return SandboxResult(timeout=timeout, **result)
+
+    def _compile(self, command, cwd, out, artifact=None):
+        """Run a compiler writing into ``out``; returns its error output on failure, else None.
+
+        Raises BuildEnvironmentError when the failure isn't the source's
+        fault, so it isn't cached against the source.
+        """
+        try:
+            result = self._command(command, cwd, None, self.compile_timeout, None)
+        except OSError as e:
+            raise BuildEnvironmentError(f"Could not run {command[0]}: {e}")
+        if result.timed_out:
+            raise CompilationTimeout(f"Compilation timed out ({self.compile_timeout:g} seconds limit)")
+        if result.returncode != 0:
+            output = result.stderr or result.stdout or ""
+            # Killed by a signal, not runnable (126/127 from the limit wrapper), or an IO problem
+            if (result.returncode < 0 or result.returncode in (126, 127) or out in output
+                    or any(marker in output for marker in ENVIRONMENT_ERRORS)):
+                raise BuildEnvironmentError(output.strip() or f"{command[0]} exited with status {result.returncode}")
+            return output or f"Compiler exited with status {result.returncode}"
+        if artifact and not os.path.exists(os.path.join(out, artifact)):
+            raise BuildEnvironmentError(f"{command[0]} reported success but wrote no {artifact}")
+        return None
+
+    def _cached_build(self, language, compiler, flags, file_path, compile):
+        """Build through the compile cache; returns ``(build_dir, error_result)``."""
+        with open(file_path, "rb") as f:
+            source = f.read()
+        key = CompileCache.key(language, compiler, flags, os.path.basename(file_path), source)
+        try:
+            build_dir, error = self.build_cache.build(key, compile)
+        except CompilationTimeout as e:
+            return None, SandboxResult(compile_error=str(e), timeout=self.timeout)
+        except BuildEnvironmentError as e:
+            print(f"[Sandbox] {language} build failed for a non-source reason: {e}")
+            return None, SandboxResult(stderr=f"Build failed: {e}", returncode=1, timeout=self.timeout)
+        if error is not None:
+            return None, SandboxResult(compile_error=error, returncode=1, timeout=self.timeout)
+        return build_dir, None
+
+    # Each _prepare_* returns (command, rlimit memory in MB or None, error result or None)
+
+    def _prepare_python(self, file_path):
+        return [sys.executable, file_path], self.memory_mb, None
+
+    def _prepare_javascript(self, file_path):
+        # V8 reserves a large virtual heap up front, so cap the heap rather than the address space
+        return ["node", f"--max-old-space-size={self.memory_mb}", file_path], None, None
+
+    def _prepare_java(self, file_path):
+        flags = ["-encoding", "UTF-8"]
+        build_dir, error = self._cached_build(
+            "Java", compiler_version("javac", "-version"), flags, file_path,
+            lambda out: self._compile(["javac", *flags, "-d", out, file_path], os.path.dirname(file_path), out),
+        )
+        if error:
+            return None, None, error
+        class_name = os.path.splitext(os.path.basename(file_path))[0]
+        return ["java", f"-Xmx{self.memory_mb}m", "-cp", build_dir, class_name], None, None
+
+    def _prepare_cpp(self, file_path):
+        flags = ["-O2"]
+        program = "program.exe" if os.name == "nt" else "program"
+        build_dir, error = self._cached_build(
+            "C++", compiler_version("g++"), flags, file_path,
+            lambda out: self._compile(["g++", *flags, file_path, "-o", os.path.join(out, program)],
+                                      os.path.dirname(file_path), out, program),
+        )
+        if error:
+            return None, None, error
+        return [os.path.join(build_dir, program)], self.memory_mb, None
+
+    def stats(self):
+        stats = {language: s.stats() for language, s in self.language_stats.items() if s.runs}
+        if self.python_pool is not None:
+            stats.setdefault("Python", {})["workers_recycled"] = self.python_pool.recycled
+        stats["build_cache"] = self.build_cache.stats()
+        return stats
+
+    def close(self):
+        if self.python_pool is not None:
+            self.python_pool.close()
+
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox():
+    """Return the process-wide CodeSandbox, starting its warm workers on first use."""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = CodeSandbox()
+        return _sandbox
+
+
+BENCH_PROGRAMS = {
+    "Python": ("solution.py", "import sys\nprint(sum(range(1000)))\n"),
+    "JavaScript": ("solution.js", "console.log([...Array(1000).keys()].reduce((a, b) => a + b, 0));\n"),
+    "C++": ("solution.cpp", "#include <iostream>\nint main() { long s = 0; for (int i = 0; i < 1000; i++) s += i; std::cout << s << std::endl; }\n"),
+    "Java": ("Solution.java", "public class Solution { public static void main(String[] a) { long s = 0; for (int i = 0; i < 1000; i++) s += i; System.out.println(s); } }\n"),
+}
+
+
+def benchmark(languages, runs=50, concurrency=4):
+    """Run a trivial program ``runs`` times per language and print throughput and latency."""
+    sandbox = CodeSandbox()
+    workdir = tempfile.mkdtemp(prefix="sandbox-bench-")
+    try:
+        for language in languages:
+            name, source = BENCH_PROGRAMS[language]
+            path = os.path.join(workdir, name)
+            with open(path, "w") as f:
+                f.write(source)
+            if language == "Python" and sandbox.python_pool is not None:
+                # Let the warm workers finish starting before timing
+                sandbox.run(language, path)
+                sandbox.language_stats[language] = LanguageStats()
+
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(lambda _: sandbox.run(language, path), range(runs)))
+            failed = [r for r in results if not r.ok]
+            if failed:
+                print(f"{language}: {len(failed)} runs failed, e.g. {failed[0].format_output()!r}")
+
+            stats = sandbox.language_stats[language].stats()
+            print(f"{language:>10}: {stats.get('runs_per_second', 0):7.1f} runs/s  "
+                  f"p50 {stats.get('latency_p50_ms', 0):8.1f} ms  p95 {stats.get('latency_p95_ms', 0):8.1f} ms")
+        if "Python" in languages:
+            # Cold interpreter per run, as before, for comparison
+            cold = LanguageStats()
+            path = os.path.join(workdir, BENCH_PROGRAMS["Python"][0])
+            for _ in range(min(runs, 20)):
+                start = time.perf_counter()
+                result = sandbox._command([sys.executable, path], workdir, None, sandbox.timeout, sandbox.memory_mb)
+                cold.record(result, start, time.perf_counter())
+            stats = cold.stats()
+            print(f"{'cold py':>10}: {stats.get('runs_per_second', 0):7.1f} runs/s  "
+                  f"p50 {stats.get('latency_p50_ms', 0):8.1f} ms  p95 {stats.get('latency_p95_ms', 0):8.1f} ms  (sequential)")
+    finally:
+        sandbox.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Code execution sandbox")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("worker", help="Run as a warm Python worker (used internally)")
+    bench = commands.add_parser("bench", help="Throughput and p95 latency per language")
+    bench.add_argument("--languages", default="Python,JavaScript,C++,Java")
+    bench.add_argument("--runs", type=int, default=50)
+    bench.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        python_worker_main()
+    elif args.command == "bench":
+        languages = [l.strip() for l in args.languages.split(",") if l.strip()]
+        available = [l for l in languages if l in BENCH_PROGRAMS and shutil.which(
+            {"Python": sys.executable, "JavaScript": "node", "C++": "g++", "Java": "javac"}[l])]
+        for language in set(languages) - set(available):
+            print(f"{language}: toolchain not found, skipped")
+        benchmark(available, args.runs, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SessionLimitError(Exception):
+    """Raised when the server cannot admit another interview session."""
+
+
+class InterviewSession:
+    def __init__(self, session_id, interviewer):
+        self.session_id = session_id
+        self.interviewer = interviewer
+        self.created_at = time.time()
+        self.last_activity = self.created_at
+        self.future = None
+
+    def touch(self):
+        self.last_activity = time.time()
+
+    def idle_time(self, now):
+        """Seconds since the last request or, for a running interview, the candidate's last answer."""
+        last = self.last_activity
+        if self.active:
+            last = max(last, getattr(self.interviewer, "last_candidate_activity", last))
+        return now - last
+
+    @property
+    def active(self):
+        return bool(self.interviewer and self.interviewer.interview_active)
+
+    def stop(self, timeout=5):
+        """Signal the interview to finish and wait briefly for its worker."""
+        if self.interviewer:
+            self.interviewer.interview_active = False
+            self.interviewer.monitoring_active = False
+        if self.future and not self.future.done():
+            try:
+                self.future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def to_dict(self):
+        info = {
+            "session_id": self.session_id,
+            "active": self.active,
+            "created_at": self.created_at,
+            "last_activity": self.last_activity,
+        }
+        scheduler = getattr(self.interviewer, "proctoring_scheduler", None)
+        if scheduler is not None:
+            info["proctoring"] = scheduler.stats()
+        prefetcher = getattr(self.interviewer, "prefetcher", None)
+        if prefetcher is not None:
+            info["prefetch"] = prefetcher.stats()
+        return info
+
+
+class InterviewSessionManager:
+    """Registry of interview sessions keyed by session ID.
+
+    Interviews run on a bounded worker pool. New sessions are refused once
+    ``max_sessions`` are live, and a background reaper evicts sessions that
+    have finished or have been idle for too long. A running interview is
+    idle only while it gets neither requests nor answers from the candidate.
+    """
+
+    def __init__(self, interviewer_factory, max_sessions=None, idle_timeout=None,
+                 finished_retention=None, reap_interval=30):
+        self.interviewer_factory = interviewer_factory
+        self.max_sessions = max_sessions or int(os.getenv("MAX_CONCURRENT_INTERVIEWS", "32"))
+        self.idle_timeout = idle_timeout or float(os.getenv("SESSION_IDLE_TIMEOUT", "3600"))
+        self.finished_retention = finished_retention or float(os.getenv("SESSION_FINISHED_RETENTION", "300"))
+        self.reap_interval = reap_interval
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_sessions,
+                                           thread_name_prefix="interview")
+        self.reaper_thread = threading.Thread(target=self._reap_idle_sessions, daemon=True)
+        self.reaper_thread.start()
+
+    def create(self, **interviewer_kwargs):
+        """Admit a new session, build its interviewer and schedule the interview."""
+        session_id = uuid.uuid4().hex
+        with self.lock:
+            if self._live_count() >= self.max_sessions:
+                raise SessionLimitError(
+                    f"Server is at capacity ({self.max_sessions} concurrent interviews)."
+                )
+            # Reserve the slot before the (slow) interviewer construction
+            self.sessions[session_id] = InterviewSession(session_id, None)
+
+        try:
+            interviewer = self.interviewer_factory(**interviewer_kwargs)
+        except Exception:
+            with self.lock:
+                self.sessions.pop(session_id, None)
+            raise
+
+        session = InterviewSession(session_id, interviewer)
+        with self.lock:
+            self.sessions[session_id] = session
+        session.future = self.executor.submit(interviewer.start_interview)
+        return session
+
+    def get(self, session_id):
+        """Return the session for ``session_id`` (or None) and mark it as used."""
+        if not session_id:
+            return None
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session and session.interviewer:
+            session.touch()
+            return session
+        return None
+
+    def end(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session:
+            session.stop()
+        return session
+
+    def list_sessions(self):
+        with self.lock:
+            return [s.to_dict() for s in self.sessions.values() if s.interviewer]
+
+    def shutdown(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.stop(timeout=1)
+        self.executor.shutdown(wait=False)
+
+    def _live_count(self):
+        # Sessions still being constructed (interviewer is None) hold a slot too
+        return sum(1 for s in self.sessions.values() if s.interviewer is None or s.active)
+
+    def _reap_idle_sessions(self):
+        while True:
+            time.sleep(self.reap_interval)
+            now = time.time()
+            expired = []
+            with self.lock:
+                for session_id, session in list(self.sessions.items()):
+                    if session.interviewer is None:
+                        continue
+                    idle = session.idle_time(now)
+                    finished = not session.active
+                    if (finished and idle > self.finished_retention) or idle > self.idle_timeout:
+                        expired.append(self.sessions.pop(session_id))
+            for session in expired:
+                print(f"[Sessions] Evicting session {session.session_id}")
+                session.stop(timeout=1)
@@ -0,0 +1,456 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from collections import OrderedDict, deque
+from io import BytesIO
+
+import numpy as np
+import pygame
+
+
+def pcm_to_sound(pcm, sample_rate):
+    """Build a pygame Sound from 16-bit mono PCM, converted to the mixer's format in memory."""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    mixer_rate, _, mixer_channels = pygame.mixer.get_init()
+    if sample_rate != mixer_rate and len(samples):
+        # Linear resampling is plenty for speech
+        duration = len(samples) / float(sample_rate)
+        positions = np.linspace(0, len(samples) - 1, int(duration * mixer_rate))
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    if mixer_channels > 1:
+        samples = np.repeat(samples[:, None], mixer_channels, axis=1)
+    return pygame.mixer.Sound(buffer=np.ascontiguousarray(samples).tobytes())
+
+
+class AudioCache:
+    """Content-addressed cache of synthesized speech.
+
+    Entries are keyed by voice, audio format and text. Recently used clips
+    stay in memory up to ``memory_bytes``; clips evicted from memory spill to
+    ``directory`` on disk, which is itself trimmed (least recently used first)
+    to ``disk_bytes``.
+    """
+
+    def __init__(self, directory=None, memory_bytes=None, disk_bytes=None):
+        self.directory = directory or os.getenv("TTS_CACHE_DIR", os.path.join(".cache", "tts"))
+        self.memory_bytes = memory_bytes or int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+        self.disk_bytes = disk_bytes or int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prewarmed = set()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(voice, audio_format, text):
+        return hashlib.sha256(f"{voice}|{audio_format}|{text}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, key + ".audio")
+
+    def get(self, voice, audio_format, text):
+        key = self.key(voice, audio_format, text)
+        with self.lock:
+            audio = self.memory.get(key)
+            if audio is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return audio
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # Mark as recently used for disk eviction
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+            spilled = self._remember(key, audio)
+        self._spill(spilled)
+        return audio
+
+    def put(self, voice, audio_format, text, audio):
+        if not audio:
+            return
+        key = self.key(voice, audio_format, text)
+        with self.lock:
+            spilled = self._remember(key, audio)
+        self._spill(spilled)
+
+    def _remember(self, key, audio):
+        """Store ``audio`` in memory and return the entries pushed out (lock held)."""
+        if key in self.memory:
+            self.memory_used -= len(self.memory.pop(key))
+        self.memory[key] = audio
+        self.memory_used += len(audio)
+        spilled = []
+        while self.memory_used > self.memory_bytes and len(self.memory) > 1:
+            old_key, old_audio = self.memory.popitem(last=False)
+            self.memory_used -= len(old_audio)
+            spilled.append((old_key, old_audio))
+        return spilled
+
+    def _spill(self, entries):
+        """Write entries evicted from memory to the disk tier."""
+        if not entries:
+            return
+        try:
+            for key, audio in entries:
+                path = self._disk_path(key)
+                if os.path.exists(path):
+                    continue
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(audio)
+                os.replace(temp_path, path)
+            self._trim_disk()
+        except OSError as e:
+            print(f"[TTS cache] Could not spill to disk: {e}")
+
+    def _trim_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".audio"):
+                continue
+            path = os.path.join(self.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def prewarm(self, voice, audio_format, phrases, synthesize):
+        """Synthesize any ``phrases`` not cached yet, in a background thread.
+
+        Only the first call per voice and format does any work.
+        """
+        with self.lock:
+            if (voice, audio_format) in self.prewarmed:
+                return None
+            self.prewarmed.add((voice, audio_format))
+
+        def warm():
+            for phrase in phrases:
+                if self.get(voice, audio_format, phrase) is not None:
+                    continue
+                try:
+                    self.put(voice, audio_format, phrase, synthesize(phrase))
+                except Exception as e:
+                    print(f"[TTS cache] Pre-warm failed for {phrase!r}: {e}")
+                    return
+        thread = threading.Thread(target=warm, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries_in_memory": len(self.memory),
+            "memory_bytes": self.memory_used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_audio_cache = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache():
+    """Return the process-wide AudioCache."""
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = AudioCache()
+        return _audio_cache
+
+
+# Voice settings per interview accent for each backend
+ACCENT_VOICES = {
+    "indian": {"polly": "Aditi", "gtts": "co.in", "espeak": "en"},
+    "american": {"polly": "Joanna", "gtts": "com", "espeak": "en-us"},
+    "british": {"polly": "Amy", "gtts": "co.uk", "espeak": "en-gb"},
+    "australian": {"polly": "Nicole", "gtts": "com.au", "espeak": "en"},
+}
+
+
+class TTSBackend:
+    """Text-to-speech engine producing 16-bit mono PCM.
+
+    Subclasses set ``name``, ``voice`` and ``sample_rate`` and implement
+    ``synthesize(text)`` returning raw PCM bytes. They should enforce their
+    own request timeouts so a hung engine fails over quickly.
+    """
+
+    name = "base"
+    voice = ""
+    sample_rate = 16000
+
+    @property
+    def cache_voice(self):
+        return f"{self.name}:{self.voice}"
+
+    @property
+    def cache_format(self):
+        return f"pcm_s16le_{self.sample_rate}"
+
+    def synthesize(self, text):
+        raise NotImplementedError
+
+
+class PollyBackend(TTSBackend):
+    name = "polly"
+
+    def __init__(self, voice="Aditi", sample_rate=16000, timeout=5):
+        import boto3
+        from botocore.config import Config
+
+        self.voice = voice
+        self.sample_rate = sample_rate  # Polly PCM supports 8000 or 16000
+        self.client = boto3.client(
+            "polly",
+            region_name=os.getenv("AWS_REGION"),
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            config=Config(connect_timeout=2, read_timeout=timeout, retries={"max_attempts": 1}),
+        )
+
+    def synthesize(self, text):
+        response = self.client.synthesize_speech(
+            Text=text,
+            OutputFormat="pcm",
+            SampleRate=str(self.sample_rate),
+            VoiceId=self.voice
+        )
+        if "AudioStream" not in response:
+            raise RuntimeError("Polly returned no audio")
+        return response["AudioStream"].read()
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS; MP3 output is decoded to PCM by the pygame mixer."""
+
+    name = "gtts"
+
+    def __init__(self, tld="co.in", lang="en", timeout=5):
+        from gtts import gTTS
+
+        self.gTTS = gTTS
+        self.voice = tld
+        self.lang = lang
+        self.timeout = timeout
+
+    @property
+    def sample_rate(self):
+        # Decoded audio comes back at the mixer's rate
+        return pygame.mixer.get_init()[0]
+
+    def synthesize(self, text):
+        mp3 = BytesIO()
+        self.gTTS(text=text, lang=self.lang, tld=self.voice, timeout=self.timeout).write_to_fp(mp3)
+        mp3.seek(0)
+        samples = pygame.sndarray.array(pygame.mixer.Sound(file=mp3))
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        return samples.astype(np.int16).tobytes()
+
+
+class EspeakBackend(TTSBackend):
+    """Local, offline synthesis through the espeak-ng (or espeak) command line."""
+
+    name = "espeak"
+
+    def __init__(self, voice="en", rate_wpm=165, timeout=5):
+        self.executable = shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.executable:
+            raise RuntimeError("espeak-ng/espeak not found on PATH")
+        self.voice = voice
+        self.rate_wpm = rate_wpm
+        self.timeout = timeout
+        self.sample_rate = 22050  # espeak's native output rate
+
+    def synthesize(self, text):
+        result = subprocess.run(
+            [self.executable, "--stdout", "-v", self.voice, "-s", str(self.rate_wpm), text],
+            capture_output=True, timeout=self.timeout, check=True
+        )
+        with wave.open(BytesIO(result.stdout)) as wav:
+            self.sample_rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+            channels = wav.getnchannels()
+        samples = np.frombuffer(frames, dtype=np.int16)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return samples.tobytes()
+
+
+BACKEND_TYPES = {
+    "polly": PollyBackend,
+    "gtts": GTTSBackend,
+    "espeak": EspeakBackend,
+}
+
+
+class BackendHealth:
+    """Latency and error tracking for one backend, with a simple circuit breaker."""
+
+    def __init__(self, window=200):
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma_latency = None
+        self.latencies = deque(maxlen=window)
+        self.open_until = 0.0
+
+    def record(self, latency, ok, slow):
+        self.calls += 1
+        self.latencies.append(latency)
+        self.ewma_latency = latency if self.ewma_latency is None else 0.8 * self.ewma_latency + 0.2 * latency
+        if ok and not slow:
+            self.consecutive_failures = 0
+        else:
+            # Errors and slow responses both count as strikes
+            self.failures += 0 if ok else 1
+            self.consecutive_failures += 1
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.open_until
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "available": self.available,
+            "ewma_latency_ms": 1000 * self.ewma_latency if self.ewma_latency is not None else None,
+            "p95_latency_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        }
+
+
+class FailoverTTS:
+    """Synthesize with the first healthy backend, failing over to the next.
+
+    A backend that errors (or exceeds ``slow_threshold`` seconds)
+    ``max_strikes`` times in a row is skipped for ``cooldown`` seconds. With
+    ``prefer_fastest`` the healthy backends are tried in order of observed
+    latency rather than configured order. Results go through the AudioCache.
+    """
+
+    def __init__(self, backends, audio_cache=None, slow_threshold=None, max_strikes=3, cooldown=60,
+                 prefer_fastest=False):
+        if not backends:
+            raise RuntimeError("No text-to-speech backend could be initialized")
+        self.backends = backends
+        self.audio_cache = audio_cache
+        self.slow_threshold = slow_threshold or float(os.getenv("TTS_SLOW_THRESHOLD", "3.0"))
+        self.max_strikes = max_strikes
+        self.cooldown = cooldown
+        self.prefer_fastest = prefer_fastest
+        self.health = {backend.name: BackendHealth() for backend in backends}
+        self.lock = threading.Lock()
+
+    @property
+    def primary(self):
+        return self._ordered_backends()[0]
+
+    def _ordered_backends(self):
+        with self.lock:
+            healthy = [b for b in self.backends if self.health[b.name].available]
+            if self.prefer_fastest:
+                healthy.sort(key=lambda b: self.health[b.name].ewma_latency or 0.0)
+            # If everything is cooling down, still try them all in order
+            return healthy or list(self.backends)
+
+    def synthesize(self, text):
+        """Return ``(pcm_bytes, sample_rate)`` for ``text``."""
+        backends = self._ordered_backends()
+        if self.audio_cache is not None:
+            for backend in backends:
+                audio = self.audio_cache.get(backend.cache_voice, backend.cache_format, text)
+                if audio is not None:
+                    return audio, backend.sample_rate
+
+        last_error = None
+        for backend in backends:
+            start = time.perf_counter()
+            try:
+                audio = backend.synthesize(text)
+                ok = bool(audio)
+            except Exception as e:
+                audio, ok, last_error = None, False, e
+                print(f"[TTS] {backend.name} failed: {e}")
+            latency = time.perf_counter() - start
+            with self.lock:
+                health = self.health[backend.name]
+                health.record(latency, ok, latency > self.slow_threshold)
+                if health.consecutive_failures >= self.max_strikes:
+                    print(f"[TTS] {backend.name} is unhealthy; skipping it for {self.cooldown}s")
+                    health.open_until = time.monotonic() + self.cooldown
+                    health.consecutive_failures = 0
+            if ok:
+                if self.audio_cache is not None:
+                    self.audio_cache.put(backend.cache_voice, backend.cache_format, text, audio)
+                return audio, backend.sample_rate
+        raise RuntimeError(f"All text-to-speech backends failed: {last_error}")
+
+    def prewarm(self, phrases):
+        """Pre-synthesize ``phrases`` with the primary backend."""
+        if self.audio_cache is None:
+            return None
+        backend = self.primary
+        return self.audio_cache.prewarm(backend.cache_voice, backend.cache_format, phrases, backend.synthesize)
+
+    def stats(self):
+        with self.lock:
+            return {name: health.stats() for name, health in self.health.items()}
+
+
+_tts_engines = {}
+_tts_lock = threading.Lock()
+
+
+def get_tts(accent="indian"):
+    """Return the process-wide FailoverTTS for ``accent``.
+
+    Backends are listed in TTS_BACKENDS (default ``polly,gtts,espeak``);
+    ones whose dependencies are missing are skipped. Set
+    TTS_PREFER_FASTEST=1 to order them by measured latency.
+    """
+    accent = accent if accent in ACCENT_VOICES else "indian"
+    with _tts_lock:
+        engine = _tts_engines.get(accent)
+        if engine is None:
+            backends = []
+            for name in os.getenv("TTS_BACKENDS", "polly,gtts,espeak").split(","):
+                name = name.strip().lower()
+                if name not in BACKEND_TYPES:
+                    print(f"[TTS] Unknown backend {name!r} ignored")
+                    continue
+                try:
+                    backends.append(BACKEND_TYPES[name](ACCENT_VOICES[accent][name]))
+                except Exception as e:
+                    print(f"[TTS] {name} backend unavailable: {e}")
+            engine = FailoverTTS(backends, get_audio_cache(),
+                                 prefer_fastest=os.getenv("TTS_PREFER_FASTEST", "0") == "1")
+            _tts_engines[accent] = engine
+        return engine
+
+
+def tts_stats():
+    with _tts_lock:
+        return {accent: engine.stats() for accent, engine in _tts_engines.items()}
@@ -0,0 +1,422 @@
+import argparse
+import os
+import time
+
+import cv2
+
+
+class FaceDetector:
+    """Face detector backend used by FaceAttentionAnalyzer.
+
+    ``detect_faces`` returns ``(x, y, w, h)`` tuples in the coordinates of
+    the image it was given, optionally followed by flattened landmark
+    ``x, y`` pairs. Detectors with ``needs_color`` get the BGR frame,
+    the others get equalized grayscale.
+    """
+
+    name = "base"
+    needs_color = False
+    # Noisy detectors need the similar-size check before reporting a second face
+    verify_multiple_faces = False
+
+    def detect_faces(self, image, min_size):
+        raise NotImplementedError
+
+    def looking_away(self, image, face, min_eye_size):
+        """True/False for ``face``, or None when the check can't be made."""
+        raise NotImplementedError
+
+
+class HaarFaceDetector(FaceDetector):
+    """Face and eye detection with OpenCV's Haar cascades."""
+
+    name = "haar"
+    verify_multiple_faces = True
+
+    def __init__(self, scale_factor=1.05, min_neighbors=7):
+        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect_faces(self, gray, min_size):
+        faces = self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=(min_size, min_size),
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+    def looking_away(self, gray, face, min_eye_size):
+        x, y, w, h = face[:4]
+        roi_gray = gray[y:y+h, x:x+w]
+        eyes = self.eye_cascade.detectMultiScale(
+            roi_gray,
+            scaleFactor=1.1,
+            minNeighbors=3,
+            minSize=(min_eye_size, min_eye_size)
+        )
+        # Only check attention if we have good eye detection
+        if len(eyes) < 2:
+            return None
+        avg_eye_y = sum(ey + eh / 2 for (ex, ey, ew, eh) in eyes) / len(eyes)
+        # Eyes looking down
+        return avg_eye_y > h * 0.75
+
+
+class YuNetFaceDetector(FaceDetector):
+    """CNN face detector (YuNet via ``cv2.FaceDetectorYN``) with five landmarks.
+
+    The ONNX model comes from ``model_path`` or YUNET_MODEL_PATH. Gaze is
+    judged from the landmarks: the head is turned when the nose tip is far
+    from the midpoint between the eyes, and tilted down when the nose sits
+    close to the mouth relative to the eye-to-mouth distance.
+    """
+
+    name = "yunet"
+    needs_color = True
+
+    def __init__(self, model_path=None, score_threshold=None, yaw_ratio=None, pitch_ratio=None):
+        model_path = model_path or os.getenv("YUNET_MODEL_PATH", "models/face_detection_yunet_2023mar.onnx")
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise RuntimeError("OpenCV >= 4.5.4 is required for YuNet")
+        if not os.path.isfile(model_path):
+            raise RuntimeError(f"YuNet model not found at {model_path}")
+        self.score_threshold = score_threshold or float(os.getenv("YUNET_SCORE_THRESHOLD", "0.8"))
+        self.yaw_ratio = yaw_ratio or float(os.getenv("YUNET_YAW_RATIO", "0.35"))
+        self.pitch_ratio = pitch_ratio or float(os.getenv("YUNET_PITCH_RATIO", "0.7"))
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), self.score_threshold, 0.3, 50)
+        self.input_size = (320, 320)
+
+    def detect_faces(self, image, min_size):
+        height, width = image.shape[:2]
+        if (width, height) != self.input_size:
+            self.detector.setInputSize((width, height))
+            self.input_size = (width, height)
+        _, detections = self.detector.detect(image)
+        if detections is None:
+            return []
+        faces = []
+        for row in detections:
+            x, y, w, h = (int(v) for v in row[:4])
+            if w < min_size or h < min_size:
+                continue
+            # Boxes can extend past the frame edge
+            x, y = max(0, x), max(0, y)
+            faces.append((x, y, w, h) + tuple(float(v) for v in row[4:14]))
+        return faces
+
+    def looking_away(self, image, face, min_eye_size):
+        if len(face) < 14:
+            return None
+        right_eye, left_eye, nose = face[4:6], face[6:8], face[8:10]
+        mouth_y = (face[11] + face[13]) / 2
+        eye_x = (right_eye[0] + left_eye[0]) / 2
+        eye_y = (right_eye[1] + left_eye[1]) / 2
+        eye_distance = abs(left_eye[0] - right_eye[0])
+        if eye_distance < 1 or mouth_y <= eye_y:
+            return None
+        turned = abs(nose[0] - eye_x) / eye_distance > self.yaw_ratio
+        tilted_down = (nose[1] - eye_y) / (mouth_y - eye_y) > self.pitch_ratio
+        return turned or tilted_down
+
+
+FACE_DETECTORS = {
+    "haar": HaarFaceDetector,
+    "yunet": YuNetFaceDetector,
+}
+
+
+def create_face_detector(name=None):
+    """Build the detector selected by ``name`` or FACE_DETECTOR.
+
+    Detectors keep per-call state, so each monitor gets its own. Falls back
+    to Haar cascades if the backend cannot be loaded.
+    """
+    name = (name or os.getenv("FACE_DETECTOR", "haar")).lower()
+    try:
+        return FACE_DETECTORS[name]()
+    except Exception as e:
+        print(f"[Vision] {name} face detector unavailable ({e}); using Haar cascades")
+        return HaarFaceDetector()
+
+
+def _shift(face, dx, dy):
+    """Translate a face box and its landmarks by (dx, dy)."""
+    x, y, w, h = face[:4]
+    landmarks = tuple(v + (dx if i % 2 == 0 else dy) for i, v in enumerate(face[4:]))
+    return (x + dx, y + dy, w, h) + landmarks
+
+
+class FaceAttentionAnalyzer:
+    """Face, multiple-face and looking-away checks on a budget.
+
+    Detection runs at most ``detection_fps`` times a second on a frame
+    downscaled by ``scale``; boxes are mapped back to full-frame
+    coordinates. Between full-frame detections the analyzer tracks the
+    known faces by re-detecting only inside a padded region around each
+    previous box, and falls back to a full-frame pass when a face is lost
+    or every ``full_detect_every`` detections so new faces are still seen.
+    """
+
+    def __init__(self, detector=None, detection_fps=None, scale=None, full_detect_every=None,
+                 min_face_size=150, min_eye_size=30, roi_padding=0.5):
+        self.detector = detector or create_face_detector()
+        self.detection_fps = detection_fps or float(os.getenv("FACE_DETECTION_FPS", "4"))
+        self.scale = scale or float(os.getenv("FACE_DETECTION_SCALE", "0.5"))
+        self.full_detect_every = full_detect_every or int(os.getenv("FACE_FULL_DETECT_EVERY", "5"))
+        self.min_face_size = min_face_size
+        self.min_eye_size = min_eye_size
+        self.roi_padding = roi_padding
+        self.tracked_faces = []
+        self.detections = 0
+        self.last_detection = None
+
+    @property
+    def interval(self):
+        return 1.0 / self.detection_fps
+
+    def due(self, now=None):
+        """Whether enough time has passed since the last detection."""
+        if self.last_detection is None:
+            return True
+        now = time.monotonic() if now is None else now
+        return now - self.last_detection >= self.interval
+
+    def _prepare(self, frame):
+        """Downscale ``frame`` into the image the detector works on."""
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if self.detector.needs_color:
+            return small
+        return cv2.equalizeHist(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+
+    def _detect_in_rois(self, image, min_size):
+        """Re-detect each tracked face inside its padded box; None if any is lost."""
+        height, width = image.shape[:2]
+        found = []
+        for face in self.tracked_faces:
+            x, y, w, h = face[:4]
+            pad_x, pad_y = int(w * self.roi_padding), int(h * self.roi_padding)
+            x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+            x1, y1 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+            faces = self.detector.detect_faces(image[y0:y1, x0:x1], min_size)
+            if not faces:
+                return None
+            found.append(_shift(max(faces, key=lambda f: f[2] * f[3]), x0, y0))
+        return found
+
+    def analyze(self, frame, now=None):
+        """Run the checks on ``frame`` and return a result dict."""
+        self.last_detection = time.monotonic() if now is None else now
+        image = self._prepare(frame)
+        min_size = max(1, int(self.min_face_size * self.scale))
+
+        faces = None
+        tracked = False
+        if self.tracked_faces and self.detections % self.full_detect_every:
+            faces = self._detect_in_rois(image, min_size)
+            tracked = faces is not None
+        if faces is None:
+            faces = self.detector.detect_faces(image, min_size)
+        self.detections += 1
+        self.tracked_faces = faces
+
+        multiple_faces = len(faces) > 1
+        if multiple_faces and self.detector.verify_multiple_faces:
+            # Additional verification - check face sizes are similar
+            areas = [f[2] * f[3] for f in faces]
+            multiple_faces = max(areas) / min(areas) < 4
+
+        looking_away = None
+        min_eye_size = max(1, int(self.min_eye_size * self.scale))
+        for face in faces:
+            result = self.detector.looking_away(image, face, min_eye_size)
+            if result is not None:
+                looking_away = bool(looking_away) or result
+
+        return {
+            "faces": [tuple(int(round(v / self.scale)) for v in f[:4]) for f in faces],
+            "face_count": len(faces),
+            "multiple_faces": multiple_faces,
+            "looking_away": looking_away,
+            "tracked": tracked,
+        }
+
+
+class AttentionEventTracker:
+    """Turns analyzer results into warnings, once per episode.
+
+    A warning fires when a condition starts and re-arms only after the
+    condition has cleared, so a candidate looking down for ten seconds
+    triggers one "looking_away" event, not forty.
+    """
+
+    def __init__(self):
+        self.multiple_faces_warning_given = False
+        self.looking_away_warning_given = False
+
+    def update(self, result):
+        """Return the cheat types that should be raised for ``result``."""
+        events = []
+        # Only trigger warning if we're very confident
+        if result["multiple_faces"]:
+            if not self.multiple_faces_warning_given:
+                events.append("multiple_faces")
+                self.multiple_faces_warning_given = True
+        else:
+            self.multiple_faces_warning_given = False
+
+        # None means the eyes couldn't be found reliably; keep the current state
+        if result["looking_away"] and not self.looking_away_warning_given:
+            events.append("looking_away")
+            self.looking_away_warning_given = True
+        elif result["looking_away"] is False:
+            self.looking_away_warning_given = False
+        return events
+
+
+def read_frames(source, max_frames):
+    """Read up to ``max_frames`` frames from a video file or camera index."""
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    video_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames, video_fps
+
+
+def baseline_analyze(detector, frame):
+    """The original full-resolution, every-frame pipeline, for comparison."""
+    gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    faces = detector.detect_faces(gray, 150)
+    for face in faces:
+        detector.looking_away(gray, face, 30)
+    return faces
+
+
+def benchmark(source, max_frames=300, detection_fps=None, scale=None, detector=None):
+    """Report CPU time per frame of the original pipeline and the rate-limited one."""
+    frames, video_fps = read_frames(source, max_frames)
+    if not frames:
+        print(f"No frames could be read from {source}")
+        return
+
+    baseline = HaarFaceDetector()
+    start = time.process_time()
+    for frame in frames:
+        baseline_analyze(baseline, frame)
+    baseline_cpu = time.process_time() - start
+
+    analyzer = FaceAttentionAnalyzer(create_face_detector(detector), detection_fps=detection_fps, scale=scale)
+    analyzed = 0
+    start = time.process_time()
+    for i, frame in enumerate(frames):
+        # Replay at the video's frame rate so the FPS limit applies as it would live
+        timestamp = i / video_fps
+        if analyzer.due(timestamp):
+            analyzer.analyze(frame, now=timestamp)
+            analyzed += 1
+    optimized_cpu = time.process_time() - start
+
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}, {video_fps:.1f} fps source")
+    print(f"baseline : {1000 * baseline_cpu / len(frames):8.2f} ms CPU/frame (every frame, full resolution)")
+    print(f"optimized: {1000 * optimized_cpu / len(frames):8.2f} ms CPU/frame "
+          f"({analyzed} {analyzer.detector.name} detections at {analyzer.detection_fps} fps, scale {analyzer.scale})")
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a[:4]
+    bx, by, bw, bh = b[:4]
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def compare_detectors(source, candidate="yunet", max_frames=300, scale=None, iou_threshold=0.3):
+    """Run Haar and ``candidate`` on every frame and report latency and agreement.
+
+    Each detector gets a fresh analyzer with tracking disabled, so every
+    frame is a full detection at the same scale. Agreement is the share of
+    frames with the same face count, the share of faces matched at
+    ``iou_threshold``, and the share of looking-away verdicts that match
+    when both detectors could make one.
+    """
+    frames, _ = read_frames(source, max_frames)
+    if not frames:
+        print(f"No frames could be read from {source}")
+        return
+
+    results = {}
+    latencies = {}
+    for name in ("haar", candidate):
+        detector = FACE_DETECTORS[name]()
+        analyzer = FaceAttentionAnalyzer(detector, scale=scale, full_detect_every=1)
+        results[name] = []
+        latencies[name] = []
+        for frame in frames:
+            start = time.perf_counter()
+            results[name].append(analyzer.analyze(frame))
+            latencies[name].append(time.perf_counter() - start)
+
+    print(f"{len(frames)} frames, scale {analyzer.scale}")
+    for name, values in latencies.items():
+        values = sorted(values)
+        detected = sum(1 for r in results[name] if r["face_count"])
+        print(f"{name:>6}: p50 {1000 * values[len(values) // 2]:7.2f} ms  "
+              f"p95 {1000 * values[int(0.95 * (len(values) - 1))]:7.2f} ms  "
+              f"faces found in {detected}/{len(frames)} frames")
+
+    same_count = matched = total_faces = gaze_agree = gaze_both = 0
+    for haar, other in zip(results["haar"], results[candidate]):
+        same_count += haar["face_count"] == other["face_count"]
+        total_faces += max(haar["face_count"], other["face_count"])
+        unmatched = list(other["faces"])
+        for box in haar["faces"]:
+            best = max(unmatched, key=lambda b: box_iou(box, b), default=None)
+            if best is not None and box_iou(box, best) >= iou_threshold:
+                matched += 1
+                unmatched.remove(best)
+        if haar["looking_away"] is not None and other["looking_away"] is not None:
+            gaze_both += 1
+            gaze_agree += haar["looking_away"] == other["looking_away"]
+
+    print(f"face count agreement : {100 * same_count / len(frames):.1f}%")
+    if total_faces:
+        print(f"boxes matched (IoU>={iou_threshold}): {100 * matched / total_faces:.1f}%")
+    if gaze_both:
+        print(f"looking-away agreement: {100 * gaze_agree / gaze_both:.1f}% of {gaze_both} frames")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Face/attention detection tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench = commands.add_parser("bench", help="CPU time per frame: original vs rate-limited pipeline")
+    bench.add_argument("source", help="Video file or camera index")
+    bench.add_argument("--frames", type=int, default=300)
+    bench.add_argument("--fps", type=float, default=None)
+    bench.add_argument("--scale", type=float, default=None)
+    bench.add_argument("--detector", choices=sorted(FACE_DETECTORS), default=None)
+    compare = commands.add_parser("compare", help="Latency and agreement of a detector against Haar")
+    compare.add_argument("source", help="Video file or camera index")
+    compare.add_argument("--detector", choices=sorted(FACE_DETECTORS), default="yunet")
+    compare.add_argument("--frames", type=int, default=300)
+    compare.add_argument("--scale", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        benchmark(args.source, args.frames, args.fps, args.scale, args.detector)
+    elif args.command == "compare":
+        compare_detectors(args.source, args.detector, args.frames, args.scale)
+
+
+if __name__ == "__main__":
+    main()